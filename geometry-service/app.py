@@ -1,51 +1,177 @@
 import os
 import io
 import math
+import base64
+import hashlib
+import json
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import tempfile
 import numpy as np
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 
 # === OCC imports ===
 from OCC.Core.STEPControl import STEPControl_Reader
 from OCC.Core.BRep import BRep_Tool
 from OCC.Core.BRepMesh import BRepMesh_IncrementalMesh
-from OCC.Core.TopAbs import TopAbs_FACE, TopAbs_EDGE, TopAbs_IN
+from OCC.Core.IMeshTools import IMeshTools_Parameters
+from OCC.Core.TopAbs import TopAbs_FACE, TopAbs_EDGE, TopAbs_IN, TopAbs_REVERSED
 from OCC.Core.TopExp import TopExp_Explorer, topexp
 from OCC.Core.TopLoc import TopLoc_Location
 from OCC.Core.Bnd import Bnd_Box
 from OCC.Core.BRepBndLib import brepbndlib
 from OCC.Core.BRepAdaptor import BRepAdaptor_Surface, BRepAdaptor_Curve
 from OCC.Core.BRepTools import breptools
-from OCC.Core.GCPnts import GCPnts_UniformAbscissa, GCPnts_AbscissaPoint
+from OCC.Core.GCPnts import GCPnts_UniformDeflection
 from OCC.Core.GeomAbs import (GeomAbs_Cylinder, GeomAbs_Plane, GeomAbs_Cone, 
                                GeomAbs_Sphere, GeomAbs_Torus, GeomAbs_BSplineSurface, 
-                               GeomAbs_BezierSurface, GeomAbs_Line, GeomAbs_Circle,
-                               GeomAbs_BSplineCurve, GeomAbs_BezierCurve)
+                               GeomAbs_BezierSurface, GeomAbs_Line, GeomAbs_Circle)
 from OCC.Core.TopoDS import topods
 from OCC.Core.GProp import GProp_GProps
 from OCC.Core.BRepGProp import brepgprop, BRepGProp_Face
 from OCC.Core.TopTools import TopTools_IndexedDataMapOfShapeListOfShape, TopTools_ListIteratorOfListOfShape
-from OCC.Core.gp import gp_Vec, gp_Pnt, gp_Dir
+from OCC.Core.gp import gp_Vec, gp_Pnt, gp_Dir, gp_Identity
 
 import logging
 
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from flask_compress import Compress
+    COMPRESS_AVAILABLE = True
+except ImportError:
+    COMPRESS_AVAILABLE = False
+
 # === CONFIG ===
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["X-Vertex-Count", "X-Index-Count"])
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("app")
 
+if not NUMBA_AVAILABLE:
+    logger.warning("⚠️ Numba not available, mesh classification uses the NumPy fallback")
+
+# Mesh/edge payloads are large and highly repetitive JSON; compress when the client accepts it
+if COMPRESS_AVAILABLE:
+    app.config["COMPRESS_MIMETYPES"] = ["application/json"]
+    app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+    app.config["COMPRESS_BR_LEVEL"] = 4
+    app.config["COMPRESS_LEVEL"] = 6
+    Compress(app)
+else:
+    logger.warning("⚠️ flask-compress not available, responses are sent uncompressed")
+
+# GeomAbs enum values as plain ints for the per-face/per-edge type checks
+SURF_PLANE = int(GeomAbs_Plane)
+SURF_CYLINDER = int(GeomAbs_Cylinder)
+CURVE_LINE = int(GeomAbs_Line)
+CURVE_CIRCLE = int(GeomAbs_Circle)
+
+# === TESSELLATION DEFAULTS ===
+# quality in [0, 1] maps to a RELATIVE linear deflection of 0.6 * 10^(-3 * quality),
+# i.e. a fraction of each edge/face size (0.85 -> ~0.17%, 0.999 -> ~0.06%).
+# quality close to 1.0 is a viewer-grade opt-in; analysis does not need it.
+DEFAULT_MESH_QUALITY = 0.85
+DEFAULT_ANGULAR_DEFLECTION_DEG = 12.0
+# Request values are rounded to this many decimals (also the cache key): a
+# 0.001 quality step moves the deflection by <1%, 0.1° is below visible faceting
+QUALITY_DECIMALS = 3
+ANGULAR_DEFLECTION_DECIMALS = 1
+# include_mesh=preview: coarse low-poly mesh (~7.5% relative deflection)
+PREVIEW_MESH_QUALITY = 0.3
+MIN_RELATIVE_DEFLECTION = 0.0005
+# Smallest mesh edge as a fraction of the part diagonal, so relative deflection
+# does not keep subdividing tiny fillets/chamfers far below what is visible
+MIN_MESH_SIZE_FRACTION = 0.0001
+# Retry settings when the tuned mesh fails: still relative, so part size does not matter
+FALLBACK_RELATIVE_DEFLECTION = 0.01
+FALLBACK_ANGULAR_DEFLECTION_DEG = 20.0
+
+# Row dtypes for streaming triangulation nodes/triangles into (n,3) arrays.
+# Face-local node indices always fit int32; the concatenated mesh widens to int64.
+XYZ_DTYPE = np.dtype((np.float64, 3))
+TRIANGLE_DTYPE = np.dtype((np.int32, 3))
+
+# Mesh faces on OCCT's thread pool by default, including meshers not built from
+# IMeshTools_Parameters (set per process, so analysis workers inherit it on import)
+BRepMesh_IncrementalMesh.SetParallelDefault(True)
+
+# Uploads are staged here for STEPControl_Reader (tmpfs: no disk round trip)
+STEP_TMP_DIR = os.environ.get("STEP_TMP_DIR", "/dev/shm")
+
+# Threads for NumPy post-processing kernels (NumPy releases the GIL inside them)
+MESH_WORKERS = int(os.environ.get("MESH_WORKERS", os.cpu_count() or 1))
+
+# === ANALYSIS WORKERS ===
+# STEP parsing, meshing and classification run in worker processes so the request
+# thread only dispatches, concurrent uploads are not serialized behind one parse,
+# and an OCCT crash takes down a worker instead of the service. 0 runs inline.
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", 2))
+_analysis_pool = None
+_analysis_pool_lock = threading.Lock()
+
+# Mesh surface classes as small ints; labels are what the frontend receives
+MESH_CLASS_EXTERNAL, MESH_CLASS_INTERNAL, MESH_CLASS_THROUGH, MESH_CLASS_PLANAR = range(4)
+MESH_CLASS_LABELS = ("external", "internal", "through", "planar")
+_MESH_CLASS_LABEL_LUT = np.array(MESH_CLASS_LABELS + (None,), dtype=object)  # id -1 -> None
+
+# Triangle class by [nearest face kind, inside the cylinder, small cylinder]
+FACE_KIND_OTHER, FACE_KIND_PLANE, FACE_KIND_CYLINDER = range(3)
+MESH_CLASS_TABLE = np.full((3, 2, 2), MESH_CLASS_EXTERNAL, dtype=np.int8)
+MESH_CLASS_TABLE[FACE_KIND_PLANE] = MESH_CLASS_PLANAR
+MESH_CLASS_TABLE[FACE_KIND_CYLINDER, 1] = (MESH_CLASS_INTERNAL, MESH_CLASS_THROUGH)
+
+# === ANALYSIS CACHE ===
+# Results keyed by (sha256 of upload, tessellation params). Quoting flows re-submit
+# the same part repeatedly (e.g. only material/tolerance change), and nothing this
+# service returns depends on those, so repeats skip STEP parsing and meshing.
+ANALYSIS_CACHE_SIZE = int(os.environ.get("ANALYSIS_CACHE_SIZE", 64))
+_analysis_cache = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+# Optional on-disk tier behind the in-memory cache: survives restarts and is shared
+# by every web worker pointed at the same directory. Unset/empty disables it.
+ANALYSIS_CACHE_DIR = os.environ.get("ANALYSIS_CACHE_DIR", "")
+ANALYSIS_CACHE_DIR_MAX_BYTES = int(os.environ.get("ANALYSIS_CACHE_DIR_MAX_MB", 5120)) * 1024 * 1024
+# Uploads larger than this are only cached in memory
+ANALYSIS_CACHE_MAX_UPLOAD_BYTES = 500 * 1024 * 1024
+# Serialized response bodies for the most recent (analysis key, transport options):
+# a repeat upload then skips JSON/base64 encoding as well. Bodies can be large, so
+# this is kept much smaller than the analysis cache.
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 8))
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+
 
 # --------------------------------------------------
 # === Geometry Utilities ===
 # --------------------------------------------------
 
-def calculate_bbox_diagonal(shape):
-    """Calculate bounding box diagonal for adaptive tessellation"""
-    bbox = Bnd_Box()
-    brepbndlib.Add(shape, bbox)
-    xmin, ymin, zmin, xmax, ymax, zmax = bbox.Get()
+def calculate_bbox_diagonal(shape, bbox=None):
+    """
+    Calculate bounding box diagonal for adaptive tessellation.
+
+    Pass a precomputed (xmin, ymin, zmin, xmax, ymax, zmax) tuple as `bbox` to
+    reuse it; the B-Rep is only traversed when no tuple is given.
+    """
+    if bbox is None:
+        box = Bnd_Box()
+        brepbndlib.Add(shape, box)
+        bbox = box.Get()
+    xmin, ymin, zmin, xmax, ymax, zmax = bbox
     dx = xmax - xmin
     dy = ymax - ymin
     dz = zmax - zmin
@@ -53,8 +179,26 @@ def calculate_bbox_diagonal(shape):
     return diagonal, (xmin, ymin, zmin, xmax, ymax, zmax)
 
 
+def calculate_part_extents(shape, use_triangulation=False):
+    """
+    Tight axis-aligned (dx, dy, dz) extents of the part, for the reported dimensions.
+
+    brepbndlib.Add() bounds B-spline faces by their control poles and pads the
+    box with shape tolerances, which is fine for deflection scaling but can
+    overstate width/height/depth on curved parts. AddOptimal() bounds the actual
+    surfaces; with use_triangulation=True (shape already meshed) it reads the
+    face triangulation nodes instead, which is much faster.
+    """
+    box = Bnd_Box()
+    brepbndlib.AddOptimal(shape, box, use_triangulation, False)
+    xmin, ymin, zmin, xmax, ymax, zmax = box.Get()
+    return xmax - xmin, ymax - ymin, zmax - zmin
+
+
 def calculate_exact_volume_and_area(shape):
     """Calculate exact volume and surface area from BREP geometry (not mesh)"""
+    # Separate frameworks on purpose: BRepGProp adds into whatever a GProp_GProps
+    # already holds, so reusing one would sum the volume and area integrals.
     volume_props = GProp_GProps()
     brepgprop.VolumeProperties(shape, volume_props)
     exact_volume = volume_props.Mass()
@@ -63,44 +207,207 @@ def calculate_exact_volume_and_area(shape):
     brepgprop.SurfaceProperties(shape, area_props)
     exact_surface_area = area_props.Mass()
 
+    center_of_mass = volume_props.CentreOfMass()
+
     logger.info(f"🔍 Exact BREP calculations: volume={exact_volume:.2f}mm³, area={exact_surface_area:.2f}mm²")
 
     return {
         'volume': exact_volume,
         'surface_area': exact_surface_area,
-        'center_of_mass': [
-            volume_props.CentreOfMass().X(),
-            volume_props.CentreOfMass().Y(),
-            volume_props.CentreOfMass().Z()
-        ]
+        'center_of_mass': list(center_of_mass.Coord())
     }
 
 
-def axes_are_parallel(axis1, axis2, tolerance=0.1):
-    """Check if two axes are parallel (dot product ~ 1 or -1)"""
-    dot = abs(axis1[0] * axis2[0] + axis1[1] * axis2[1] + axis1[2] * axis2[2])
-    return dot > (1.0 - tolerance)
+def coaxial_group_ids(axes, positions, tolerance_mm, parallel_tolerance):
+    """
+    Greedy coaxial grouping as scalar loops over (N,3) axis/position arrays.
 
-def axes_are_coaxial(pos1, axis1, pos2, axis2, tolerance_mm=0.5):
-    """Check if two cylindrical axes are coaxial (same axis line)"""
-    if not axes_are_parallel(axis1, axis2):
-        return False
-    
-    # Vector from pos1 to pos2
-    v = [pos2[0] - pos1[0], pos2[1] - pos1[1], pos2[2] - pos1[2]]
-    
-    # Cross product with axis
-    cross = [
-        v[1] * axis1[2] - v[2] * axis1[1],
-        v[2] * axis1[0] - v[0] * axis1[2],
-        v[0] * axis1[1] - v[1] * axis1[0]
-    ]
-    
-    # Distance is magnitude of cross product
-    dist = math.sqrt(cross[0]**2 + cross[1]**2 + cross[2]**2)
-    return dist < tolerance_mm
+    Returns an int64 group id per face; ids are numbered in seed order and each
+    group is seeded by its lowest-index face. Compiled by Numba when available.
+    """
+    count = axes.shape[0]
+    group_ids = np.full(count, -1, dtype=np.int64)
+    next_id = 0
+
+    for i in range(count):
+        if group_ids[i] >= 0:
+            continue
+        group_ids[i] = next_id
+        ax, ay, az = axes[i, 0], axes[i, 1], axes[i, 2]
+        px, py, pz = positions[i, 0], positions[i, 1], positions[i, 2]
+
+        # Faces before i are all grouped already (each would have seeded one)
+        for j in range(i + 1, count):
+            if group_ids[j] >= 0:
+                continue
+            if abs(ax * axes[j, 0] + ay * axes[j, 1] + az * axes[j, 2]) <= 1.0 - parallel_tolerance:
+                continue
+            # Distance of p_j from the seed's axis line: |(p_j - p_i) x a_i|
+            dx = positions[j, 0] - px
+            dy = positions[j, 1] - py
+            dz = positions[j, 2] - pz
+            cx = dy * az - dz * ay
+            cy = dz * ax - dx * az
+            cz = dx * ay - dy * ax
+            if np.sqrt(cx * cx + cy * cy + cz * cz) < tolerance_mm:
+                group_ids[j] = next_id
+        next_id += 1
+
+    return group_ids
+
+
+if NUMBA_AVAILABLE:
+    _coaxial_group_ids_kernel = njit(cache=True, nogil=True)(coaxial_group_ids)
+
+
+def group_coaxial_cylinders(cylindrical_faces, tolerance_mm=0.5, parallel_tolerance=0.1):
+    """
+    Group cylindrical faces that share the same axis line.
+
+    Axes and positions are stacked into (N,3) arrays. With Numba the pairwise
+    tests run in the compiled coaxial_group_ids() loop; otherwise as NumPy ops:
+    one axes @ axes.T gives the parallel mask (|dot| ~ 1), and |(p_j - p_i) x a_i|
+    gives every face's distance from a seed's axis line. Grouping stays greedy
+    in face order, so each group is seeded by its first face exactly as before.
+    """
+    count = len(cylindrical_faces)
+    if count == 0:
+        return []
+    if count == 1:
+        return [list(cylindrical_faces)]
+
+    axes = np.array([c['axis'] for c in cylindrical_faces], dtype=np.float64)
+    positions = np.array([c['position'] for c in cylindrical_faces], dtype=np.float64)
+
+    if NUMBA_AVAILABLE:
+        group_ids = _coaxial_group_ids_kernel(axes, positions, tolerance_mm, parallel_tolerance)
+        grouped = [[] for _ in range(int(group_ids.max()) + 1)]
+        for face, group_id in zip(cylindrical_faces, group_ids.tolist()):
+            grouped[group_id].append(face)
+        return grouped
+
+    parallel = np.abs(axes @ axes.T) > (1.0 - parallel_tolerance)
+
+    processed = np.zeros(count, dtype=bool)
+    grouped = []
+
+    for i in range(count):
+        if processed[i]:
+            continue
+
+        # Distance of every other axis position from this seed's axis line
+        offsets = np.cross(positions - positions[i], axes[i])
+        dist = np.sqrt(np.einsum('ij,ij->i', offsets, offsets))
+        members = parallel[i] & (dist < tolerance_mm) & ~processed
+        members[i] = True
+
+        member_idx = np.flatnonzero(members)
+        processed[member_idx] = True
+        grouped.append([cylindrical_faces[j] for j in member_idx])
+
+        # Every face already belongs to a group; nothing left to seed
+        if processed.all():
+            break
+
+    return grouped
+
+
+def build_face_record(face, local_triangulations):
+    """
+    Build one collect_faces() record for `face`.
 
-def recognize_manufacturing_features(shape):
+    `local_triangulations` caches read_triangulation() results across
+    instances of the same face (see collect_faces).
+    """
+    surface = BRepAdaptor_Surface(face)
+    surf_type = surface.GetType()
+
+    record = {
+        'face': face,
+        'surface': surface,
+        'type': surf_type
+    }
+
+    location = TopLoc_Location()
+    triangulation = BRep_Tool.Triangulation(face, location)
+    area = 0.0
+    if triangulation is not None:
+        instance_key = face.Located(TopLoc_Location())
+        local = local_triangulations.get(instance_key)
+        if local is None:
+            local = read_triangulation(triangulation)
+            local_triangulations[instance_key] = local
+        nodes = apply_location(local[0], location.Transformation())
+        triangles = local[1]
+        record['nodes'] = nodes
+        record['triangles'] = triangles
+        area, center = triangulated_area_and_center(nodes, triangles)
+
+    if area > 0.0:
+        record['area'] = area
+        record['center'] = center
+    else:
+        face_props = GProp_GProps()
+        brepgprop.SurfaceProperties(face, face_props)
+        record['area'] = face_props.Mass()
+        record['center'] = list(face_props.CentreOfMass().Coord())
+
+    if surf_type == SURF_CYLINDER:
+        # One gp_Ax3 copy serves axis, location and handedness
+        cyl = surface.Cylinder()
+        frame = cyl.Position()
+        record['radius'] = cyl.Radius()
+        # V runs along the axis on a cylinder, so the face's V bounds are its axial extent
+        record['axial_range'] = (surface.FirstVParameter(), surface.LastVParameter())
+        record['axis'] = list(frame.Direction().Coord())
+        record['position'] = list(frame.Location().Coord())
+        # +1 if the face normal points away from the axis (boss), -1 if towards it (hole)
+        sign = 1.0 if frame.Direct() else -1.0
+        record['normal_sign'] = -sign if face.Orientation() == TopAbs_REVERSED else sign
+    elif surf_type == SURF_PLANE:
+        # Outward normal of the face: plane direction (negated for a left-handed
+        # frame), flipped again when the face is REVERSED
+        frame = surface.Plane().Position()
+        sign = 1.0 if frame.Direct() else -1.0
+        if face.Orientation() == TopAbs_REVERSED:
+            sign = -sign
+        record['normal'] = [sign * c for c in frame.Direction().Coord()]
+
+    return record
+
+
+def collect_faces(shape):
+    """
+    Walk the BREP faces ONCE and record everything the analysis passes need.
+
+    Each record holds the face, its surface adaptor and type, area and center of
+    mass; cylindrical faces also carry radius and axis. Feature recognition,
+    tessellation and mesh classification all read from this table instead of
+    re-exploring the shape and rebuilding BRepAdaptor_Surface per face.
+
+    If the shape is already meshed, each face's triangulation is extracted once
+    ('nodes'/'triangles', reused by tessellate_shape) and area/center come from
+    it; only faces without a triangulation pay for a GProp surface integration.
+    """
+    faces = []
+    # Instanced faces (same TShape under another location) share one triangulation;
+    # read it from OCCT once and only re-apply the location for each instance
+    local_triangulations = {}
+
+    face_explorer = TopExp_Explorer(shape, TopAbs_FACE)
+    while face_explorer.More():
+        face = topods.Face(face_explorer.Current())
+        face_explorer.Next()
+        try:
+            faces.append(build_face_record(face, local_triangulations))
+        except Exception as e:
+            # One malformed face should not sink the whole analysis
+            logger.warning(f"⚠️ Skipping face that could not be analyzed: {e}")
+
+    return faces
+
+
+def recognize_manufacturing_features(shape, faces=None, bbox=None):
     """
     Analyze BREP topology to detect ACCURATE manufacturing features.
     
@@ -114,6 +421,9 @@ def recognize_manufacturing_features(shape):
     - THROUGH-HOLES: Verify penetration by checking face connectivity
     - BLIND HOLES: Detect terminated cylindrical cavities
     - BORES: Large internal cylinders with specific depth constraints
+
+    `faces` is the table from collect_faces() and `bbox` the shape's bounding box
+    tuple; each is computed here if not supplied.
     """
     features = {
         'through_holes': [],
@@ -127,78 +437,44 @@ def recognize_manufacturing_features(shape):
         'complex_surfaces': []
     }
 
-    bbox_diagonal, (xmin, ymin, zmin, xmax, ymax, zmax) = calculate_bbox_diagonal(shape)
-    bbox_center = [(xmin + xmax) / 2, (ymin + ymax) / 2, (zmin + zmax) / 2]
+    if faces is None:
+        faces = collect_faces(shape)
+
+    bbox_diagonal, (xmin, ymin, zmin, xmax, ymax, zmax) = calculate_bbox_diagonal(shape, bbox)
+    bbox_cx, bbox_cy, bbox_cz = (xmin + xmax) / 2, (ymin + ymax) / 2, (zmin + zmax) / 2
     bbox_size = max(xmax - xmin, ymax - ymin, zmax - zmin)
 
     # === STAGE 1: COLLECT ALL CYLINDRICAL FACES ===
     cylindrical_faces = []
     planar_faces_list = []
     
-    face_explorer = TopExp_Explorer(shape, TopAbs_FACE)
-    while face_explorer.More():
-        face = topods.Face(face_explorer.Current())
-        surface = BRepAdaptor_Surface(face)
-        surf_type = surface.GetType()
-        
-        face_props = GProp_GProps()
-        brepgprop.SurfaceProperties(face, face_props)
-        face_area = face_props.Mass()
-        face_center = face_props.CentreOfMass()
+    for record in faces:
+        surf_type = record['type']
         
-        if surf_type == GeomAbs_Cylinder:
-            cyl = surface.Cylinder()
-            radius = cyl.Radius()
-            axis_dir = cyl.Axis().Direction()
-            axis_pos = cyl.Axis().Location()
-            
+        if surf_type == SURF_CYLINDER:
             cylindrical_faces.append({
-                'face': face,
-                'radius': radius,
-                'diameter': radius * 2,
-                'axis': [axis_dir.X(), axis_dir.Y(), axis_dir.Z()],
-                'position': [axis_pos.X(), axis_pos.Y(), axis_pos.Z()],
-                'center': [face_center.X(), face_center.Y(), face_center.Z()],
-                'area': face_area
+                'face': record['face'],
+                'radius': record['radius'],
+                'diameter': record['radius'] * 2,
+                'axis': record['axis'],
+                'position': record['position'],
+                'axial_range': record['axial_range'],
+                'center': record['center'],
+                'area': record['area']
             })
-        elif surf_type == GeomAbs_Plane:
+        elif surf_type == SURF_PLANE:
             planar_faces_list.append({
-                'area': face_area,
-                'center': [face_center.X(), face_center.Y(), face_center.Z()]
+                'area': record['area'],
+                'center': record['center']
             })
         else:
             features['complex_surfaces'].append({
                 'type': str(surf_type),
-                'area': face_area
+                'area': record['area']
             })
-        
-        face_explorer.Next()
     
     # === STAGE 2: GROUP COAXIAL CYLINDRICAL FACES ===
-    processed = set()
-    grouped_cylinders = []
-    
-    for i, cyl_data in enumerate(cylindrical_faces):
-        if i in processed:
-            continue
-        
-        group = [cyl_data]
-        processed.add(i)
-        
-        # Find all coaxial faces with this cylinder
-        for j, other_cyl in enumerate(cylindrical_faces):
-            if j in processed:
-                continue
-            
-            if axes_are_coaxial(
-                cyl_data['position'], cyl_data['axis'],
-                other_cyl['position'], other_cyl['axis'],
-                tolerance_mm=0.5
-            ):
-                group.append(other_cyl)
-                processed.add(j)
-        
-        grouped_cylinders.append(group)
+    grouped_cylinders = group_coaxial_cylinders(cylindrical_faces, tolerance_mm=0.5)
     
     # === STAGE 3: CLASSIFY EACH CYLINDRICAL FEATURE GROUP ===
     for group in grouped_cylinders:
@@ -212,22 +488,30 @@ def recognize_manufacturing_features(shape):
         primary = group[0]
         
         # Calculate if internal or external based on center-to-bbox relationship
-        center = primary['center']
+        cx, cy, cz = primary['center']
         axis_pos = primary['position']
         
-        dist_to_bbox = math.sqrt(
-            (bbox_center[0] - center[0])**2 +
-            (bbox_center[1] - center[1])**2 +
-            (bbox_center[2] - center[2])**2
-        )
+        dx = bbox_cx - cx
+        dy = bbox_cy - cy
+        dz = bbox_cz - cz
+        dist_to_bbox = math.sqrt(dx * dx + dy * dy + dz * dz)
         
         is_internal = dist_to_bbox < (bbox_size * 0.3)  # Conservative threshold
         
+        # Axial depth: both ends of every face in the group, projected onto the
+        # group's axis (O(k), and a true length along the axis)
+        group_axis = np.asarray(primary['axis'])
+        positions = np.array([c['position'] for c in group])
+        axes = np.array([c['axis'] for c in group])
+        ranges = np.array([c['axial_range'] for c in group])
+        axial = (positions @ group_axis)[:, None] + ranges * (axes @ group_axis)[:, None]
+
         feature_data = {
             'diameter': avg_radius * 2,
             'radius': avg_radius,
             'axis': primary['axis'],
             'position': axis_pos,
+            'depth': float(axial.max() - axial.min()),
             'area': sum(c['area'] for c in group),
             'coaxial_face_count': len(group)
         }
@@ -320,7 +604,221 @@ def get_surface_tessellation_params(surface, diagonal):
         }
 
 
-def tessellate_shape(shape):
+def read_triangulation(triangulation):
+    """
+    Copy a face triangulation into NumPy arrays in its own (local) coordinates.
+
+    Returns (nodes, triangles): an (n,3) float64 array and a (t,3) int32 array
+    of 0-based node indices in the triangulation's native winding.
+    """
+    # Streamed straight into preallocated (n,3) buffers: no intermediate list of
+    # tuples, and gp_Pnt.Coord() returns all three coordinates in one OCCT call
+    nb_nodes = triangulation.NbNodes()
+    nodes = np.fromiter(
+        (pnt.Coord() for pnt in map(triangulation.Node, range(1, nb_nodes + 1))),
+        dtype=XYZ_DTYPE, count=nb_nodes
+    )
+
+    nb_triangles = triangulation.NbTriangles()
+    triangles = np.fromiter(
+        (tri.Get() for tri in map(triangulation.Triangle, range(1, nb_triangles + 1))),
+        dtype=TRIANGLE_DTYPE, count=nb_triangles
+    )
+    triangles -= 1
+
+    return nodes, triangles
+
+
+def apply_location(nodes, trsf):
+    """Apply a face location (gp_Trsf) to (n,3) nodes as one matrix product"""
+    if trsf.Form() == gp_Identity:
+        return nodes
+    # gp_Trsf as a 3x4 matrix [R|t] (Value() already includes the scale factor)
+    matrix = np.array([[trsf.Value(row, col) for col in range(1, 5)] for row in range(1, 4)])
+    return nodes @ matrix[:, :3].T + matrix[:, 3]
+
+
+def triangulation_to_arrays(triangulation, trsf):
+    """
+    Copy a face triangulation into NumPy arrays in world coordinates.
+
+    Returns (nodes, triangles) as read_triangulation(), with the location
+    transform applied to the nodes.
+    """
+    nodes, triangles = read_triangulation(triangulation)
+    return apply_location(nodes, trsf), triangles
+
+
+def triangle_normals(points, triangles):
+    """
+    Unnormalized triangle normals (p1 - p0) x (p2 - p0); their length is twice
+    the triangle area.
+
+    Points are transposed to coordinate columns (SoA) first, so every gather,
+    subtraction and product works on contiguous 1-D arrays. Returns (t,3).
+    """
+    columns = np.ascontiguousarray(np.asarray(points, dtype=np.float64).T)
+    p0 = columns[:, triangles[:, 0]]
+    ex, ey, ez = columns[:, triangles[:, 1]] - p0
+    fx, fy, fz = columns[:, triangles[:, 2]] - p0
+
+    # Component-wise cross product into preallocated rows: no (t,3) temporaries
+    normals = np.empty((3, len(triangles)))
+    scratch = np.empty(len(triangles))
+    np.multiply(ey, fz, out=normals[0])
+    normals[0] -= np.multiply(ez, fy, out=scratch)
+    np.multiply(ez, fx, out=normals[1])
+    normals[1] -= np.multiply(ex, fz, out=scratch)
+    np.multiply(ex, fy, out=normals[2])
+    normals[2] -= np.multiply(ey, fx, out=scratch)
+    return normals.T
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, parallel=True, nogil=True)
+    def _unit_normals_kernel(points, triangles, normals):
+        """Compiled unit_triangle_normals(): one pass per triangle, parallel, no temporaries."""
+        for t in prange(triangles.shape[0]):
+            p0 = triangles[t, 0]
+            p1 = triangles[t, 1]
+            p2 = triangles[t, 2]
+            ex = points[p1, 0] - points[p0, 0]
+            ey = points[p1, 1] - points[p0, 1]
+            ez = points[p1, 2] - points[p0, 2]
+            fx = points[p2, 0] - points[p0, 0]
+            fy = points[p2, 1] - points[p0, 1]
+            fz = points[p2, 2] - points[p0, 2]
+            nx = ey * fz - ez * fy
+            ny = ez * fx - ex * fz
+            nz = ex * fy - ey * fx
+            squared_length = nx * nx + ny * ny + nz * nz
+            if squared_length > 0.0:
+                inv_length = 1.0 / math.sqrt(squared_length)
+                normals[t, 0] = nx * inv_length
+                normals[t, 1] = ny * inv_length
+                normals[t, 2] = nz * inv_length
+            else:
+                normals[t, 0] = 0.0
+                normals[t, 1] = 0.0
+                normals[t, 2] = 1.0
+
+
+def unit_triangle_normals(points, triangles):
+    """
+    Unit triangle normals, (t,3); degenerate (zero-area) triangles get +Z.
+
+    Compiled with Numba when available, otherwise triangle_normals() followed by
+    one reciprocal square root per row.
+    """
+    if NUMBA_AVAILABLE:
+        normals = np.empty((len(triangles), 3))
+        _unit_normals_kernel(np.ascontiguousarray(points, dtype=np.float64),
+                             np.ascontiguousarray(triangles), normals)
+        return normals
+
+    normals = triangle_normals(points, triangles)
+    squared_lengths = np.einsum('ij,ij->i', normals, normals)
+    degenerate = squared_lengths == 0
+    normals *= np.where(degenerate, 0.0, 1.0 / np.sqrt(np.where(degenerate, 1.0, squared_lengths)))[:, None]
+    normals[degenerate] = (0.0, 0.0, 1.0)
+    return normals
+
+
+def triangulated_area_and_center(nodes, triangles):
+    """
+    Area and area-weighted centroid of a triangulated face.
+
+    Returns (area, [x, y, z]); area is 0.0 for an empty/degenerate triangulation.
+    """
+    if len(triangles) == 0:
+        return 0.0, None
+
+    doubled_normals = triangle_normals(nodes, triangles)
+    triangle_areas = 0.5 * np.sqrt(np.einsum('ij,ij->i', doubled_normals, doubled_normals))
+    area = float(triangle_areas.sum())
+    if area <= 0.0:
+        return 0.0, None
+
+    # Sum of area * corner-mean, regrouped per node: each node is weighted by the
+    # areas of the triangles it belongs to, so no (t,3,3) corner array is gathered
+    node_weights = np.bincount(triangles.ravel(), weights=np.repeat(triangle_areas, 3), minlength=len(nodes))
+    center = (node_weights @ nodes) / (3.0 * area)
+    return area, center.tolist()
+
+
+def weld_vertices(nodes, decimals=6):
+    """
+    Merge coincident nodes (equal after rounding to `decimals`).
+
+    Coordinates are quantized to int64 and grouped with one stable lexsort over
+    the three key columns (np.unique(axis=0) sorts opaque row records, which is
+    several times slower), so no per-node Python tuples or dict lookups are
+    involved. Vertices are numbered in order of first appearance and keep that
+    node's exact position.
+
+    Returns (vertices (v,3), node_to_vertex (n,) index array).
+    """
+    if len(nodes) == 0:
+        return nodes, np.empty(0, dtype=np.int64)
+
+    # Quantize in one scratch buffer: scale, round in place, then one int64 cast
+    scaled = np.multiply(nodes, 10.0 ** decimals)
+    keys = np.rint(scaled, out=scaled).astype(np.int64)
+
+    # Stable sort by (x, y, z): equal keys keep node order, so the first node of
+    # each run is that key's first appearance
+    order = np.lexsort((keys[:, 2], keys[:, 1], keys[:, 0]))
+    sorted_keys = keys[order]
+    run_starts = np.empty(len(order), dtype=bool)
+    run_starts[0] = True
+    np.any(sorted_keys[1:] != sorted_keys[:-1], axis=1, out=run_starts[1:])
+
+    first = order[run_starts]
+    inverse = np.empty(len(order), dtype=np.int64)
+    inverse[order] = np.cumsum(run_starts) - 1
+
+    # Runs come out in sorted-key order; renumber by first appearance
+    appearance = np.argsort(first)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[appearance] = np.arange(len(first))
+
+    return nodes[first[appearance]], rank[inverse]
+
+
+def mesh_shape(shape, bbox=None, quality=DEFAULT_MESH_QUALITY,
+               angular_deflection_deg=DEFAULT_ANGULAR_DEFLECTION_DEG):
+    """
+    Run BRepMesh on the shape; triangulations are stored on its faces.
+
+    Deflection is RELATIVE (scaled by each edge/face size, so large parts are not
+    oversampled) and derived from `quality`; `angular_deflection_deg` is in degrees.
+    The minimum element size is tied to the part diagonal, so small details on a
+    large part are not meshed finer than the part's own scale warrants.
+    Faces already meshed at least this finely are left untouched by OCCT.
+    """
+    diagonal, bbox = calculate_bbox_diagonal(shape, bbox)
+    
+    params = IMeshTools_Parameters()
+    params.Deflection = max(0.6 * 10 ** (-quality * 3), MIN_RELATIVE_DEFLECTION)
+    params.Angle = math.radians(angular_deflection_deg)  # OCCT expects radians
+    params.Relative = True
+    params.InParallel = True
+    params.MinSize = diagonal * MIN_MESH_SIZE_FRACTION
+    
+    logger.info(f"🎨 Using relative tessellation (quality={quality}, linear={params.Deflection:.5f}×size, "
+                f"angular={angular_deflection_deg}°, min size={params.MinSize:.4f}mm)...")
+    
+    # Constructor runs Perform() itself
+    mesher = BRepMesh_IncrementalMesh(shape, params)
+    
+    if not mesher.IsDone():
+        logger.warning("⚠️ Tessellation incomplete, retrying with coarser fallback settings")
+        BRepMesh_IncrementalMesh(shape, FALLBACK_RELATIVE_DEFLECTION, True,
+                                 math.radians(FALLBACK_ANGULAR_DEFLECTION_DEG), True)
+
+
+def tessellate_shape(shape, faces=None, bbox=None, quality=DEFAULT_MESH_QUALITY,
+                     angular_deflection_deg=DEFAULT_ANGULAR_DEFLECTION_DEG, remesh=True):
     """
     Create ultra-high-quality mesh using GLOBAL adaptive tessellation.
     
@@ -328,180 +826,146 @@ def tessellate_shape(shape):
     Will be replaced by dedicated mesh service with Gmsh for production-quality results.
     
     This ensures service stability while mesh_service.py delivers best-in-class visuals.
+
+    `faces` is the table from collect_faces() and `bbox` the shape's bounding box
+    tuple; each is computed here if not supplied. Meshing parameters are those of
+    mesh_shape(); if the shape was already meshed with them, that step is a no-op
+    and per-face arrays already extracted by collect_faces() are reused. Pass
+    remesh=False when the caller has meshed the shape itself; the shape is then
+    only read, so other threads may query it concurrently.
+
+    Returns flat NumPy arrays: 'vertices' (float64, xyz...), 'normals'
+    (float32, xyz...) and 'indices' (uint32); they are only turned into lists
+    for the JSON response.
     """
-    diagonal, bbox = calculate_bbox_diagonal(shape)
+    if remesh:
+        mesh_shape(shape, bbox, quality, angular_deflection_deg)
+
+    if faces is None:
+        faces = collect_faces(shape)
     
-    # Ultra-fine global tessellation (temporary baseline for stability)
-    linear_deflection = diagonal * 0.0001  # 0.01% of diagonal
-    angular_deflection = 1.0  # 1 degree
+    node_chunks = []  # Per-face (n,3) world-space node arrays
+    triangle_chunks = []  # Per-face (t,3) triangle arrays, indices local to the face
+    kept_faces = []  # (record, REVERSED flag) for every face that contributed triangles
     
-    logger.info(f"🎨 Using ultra-fine global tessellation (linear={linear_deflection:.4f}mm, angular={angular_deflection}°)...")
+    # PASS 1: Gather node positions and triangles, one face at a time. Only the
+    # OCCT reads are per face; offsets, winding and normals are batched below.
+    for record in faces:
+        face = record['face']
+        nodes = record.get('nodes')
+        triangles = record.get('triangles')
+        
+        if nodes is None:
+            location = TopLoc_Location()
+            triangulation = BRep_Tool.Triangulation(face, location)
+            if triangulation is None:
+                continue
+            try:
+                nodes, triangles = triangulation_to_arrays(triangulation, location.Transformation())
+            except Exception as e:
+                logger.warning(f"⚠️ Skipping face with unreadable triangulation: {e}")
+                continue
+
+        node_chunks.append(nodes)
+        triangle_chunks.append(triangles)
+        kept_faces.append((record, face.Orientation() == TopAbs_REVERSED))
     
-    mesher = BRepMesh_IncrementalMesh(shape, linear_deflection, False, angular_deflection, True)
-    mesher.Perform()
+    node_counts = np.array([len(nodes) for nodes in node_chunks], dtype=np.int64)
+    triangle_counts = np.array([len(triangles) for triangles in triangle_chunks], dtype=np.int64)
+    face_is_plane = np.array([record['type'] == SURF_PLANE for record, _ in kept_faces], dtype=bool)
+    face_is_cylinder = np.array([record['type'] == SURF_CYLINDER for record, _ in kept_faces], dtype=bool)
+    face_is_reversed = np.array([reversed_face for _, reversed_face in kept_faces], dtype=bool)
     
-    if not mesher.IsDone():
-        logger.warning("⚠️ Tessellation incomplete, using default settings")
-        mesher = BRepMesh_IncrementalMesh(shape, diagonal * 0.001, False, 5.0, True)
-        mesher.Perform()
+    all_nodes = np.concatenate(node_chunks) if node_chunks else np.empty((0, 3))
+    all_triangles = (np.concatenate(triangle_chunks, dtype=np.int64) if triangle_chunks
+                     else np.empty((0, 3), dtype=np.int64))
     
-    vertices = []
-    indices = []
-    vertex_map = {}  # Maps (x,y,z) -> vertex_index
-    vertex_face_normals = {}  # Maps vertex_index -> [list of face normals]
-    face_surface_types = {}  # Maps triangle_index -> surface_type ("plane" or "cylinder")
-    current_index = 0
-    triangle_index = 0
+    # Offset each face's triangles into the concatenated nodes and fix the
+    # winding of REVERSED faces
+    node_offsets = np.cumsum(node_counts) - node_counts
+    all_triangles += np.repeat(node_offsets, triangle_counts)[:, None]
+    triangle_is_reversed = np.repeat(face_is_reversed, triangle_counts)
+    all_triangles[triangle_is_reversed] = all_triangles[triangle_is_reversed][:, [0, 2, 1]]
     
-    # PASS 1: Build vertex positions and collect face normals for each vertex
-    face_exp = TopExp_Explorer(shape, TopAbs_FACE)
+    triangle_is_plane = np.repeat(face_is_plane, triangle_counts)
+    plane_face_normals = np.array([record['normal'] for record, _ in kept_faces if record['type'] == SURF_PLANE],
+                                  dtype=np.float64).reshape(-1, 3)
+    planar_normals = np.repeat(plane_face_normals, triangle_counts[face_is_plane], axis=0)
     
-    while face_exp.More():
-        face = topods.Face(face_exp.Current())
-        location = TopLoc_Location()
-        triangulation = BRep_Tool.Triangulation(face, location)
-        
-        if triangulation is None:
-            face_exp.Next()
-            continue
-        
-        trsf = location.Transformation()
-        surface = BRepAdaptor_Surface(face)
-        surf_type = surface.GetType()
-        surface_type_str = "plane" if surf_type == GeomAbs_Plane else "cylinder"
-        face_orientation = face.Orientation()
-        normal_flip = 1.0 if face_orientation == 0 else -1.0
-        
-        # Compute face normal at center
-        try:
-            props = BRepGProp_Face(face)
-            u_mid = (surface.FirstUParameter() + surface.LastUParameter()) / 2
-            v_mid = (surface.FirstVParameter() + surface.LastVParameter()) / 2
-            normal_gp = gp_Vec()
-            point_gp = gp_Pnt()
-            props.Normal(u_mid, v_mid, point_gp, normal_gp)
-            
-            face_normal = np.array([
-                normal_gp.X() * normal_flip,
-                normal_gp.Y() * normal_flip,
-                normal_gp.Z() * normal_flip
-            ])
-            
-            # Normalize
-            length = np.linalg.norm(face_normal)
-            if length > 0:
-                face_normal = face_normal / length
-        except:
-            face_normal = np.array([0, 0, 1])
-        
-        # Process vertices for this face
-        node_count = triangulation.NbNodes()
-        local_vertex_map = {}
-        
-        for i in range(1, node_count + 1):
-            pnt = triangulation.Node(i)
-            pnt.Transform(trsf)
-            
-            vertex_key = (round(pnt.X(), 6), round(pnt.Y(), 6), round(pnt.Z(), 6))
-            
-            if vertex_key not in vertex_map:
-                vertices.extend([pnt.X(), pnt.Y(), pnt.Z()])
-                vertex_map[vertex_key] = current_index
-                vertex_face_normals[current_index] = []
-                local_vertex_map[i] = current_index
-                current_index += 1
-            else:
-                local_vertex_map[i] = vertex_map[vertex_key]
-            
-            # Add this face's normal to the vertex's normal list
-            v_idx = vertex_map[vertex_key]
-            vertex_face_normals[v_idx].append(face_normal)
-        
-        # Process triangles
-        triangle_count = triangulation.NbTriangles()
-        for i in range(1, triangle_count + 1):
-            triangle = triangulation.Triangle(i)
-            n1, n2, n3 = triangle.Get()
-            
-            if face_orientation == 0:  # TopAbs_FORWARD
-                indices.extend([
-                    local_vertex_map[n1],
-                    local_vertex_map[n2],
-                    local_vertex_map[n3]
-                ])
-            else:  # TopAbs_REVERSED
-                indices.extend([
-                    local_vertex_map[n1],
-                    local_vertex_map[n3],
-                    local_vertex_map[n2]
-                ])
-            
-            # Store surface type for this triangle
-            face_surface_types[triangle_index] = surface_type_str
-            triangle_index += 1
-        
-        face_exp.Next()
+    # Exact smooth normal for cylinder nodes: the node's offset from its face's
+    # axis, normalized and signed by the face orientation
+    cylinder_records = [record for record, _ in kept_faces if record['type'] == SURF_CYLINDER]
+    cylinder_node_counts = node_counts[face_is_cylinder]
+    cylinder_nodes = np.flatnonzero(np.repeat(face_is_cylinder, node_counts))
+    node_axes = np.repeat(np.array([r['axis'] for r in cylinder_records], dtype=np.float64).reshape(-1, 3),
+                          cylinder_node_counts, axis=0)
+    radial = all_nodes[cylinder_nodes] - np.repeat(
+        np.array([r['position'] for r in cylinder_records], dtype=np.float64).reshape(-1, 3),
+        cylinder_node_counts, axis=0)
+    radial -= np.einsum('ij,ij->i', radial, node_axes)[:, None] * node_axes
+    radial_lengths = np.sqrt(np.einsum('ij,ij->i', radial, radial))
+    off_axis = radial_lengths > 0
+    node_signs = np.repeat(np.array([r['normal_sign'] for r in cylinder_records], dtype=np.float64),
+                           cylinder_node_counts)
+    cylinder_nodes = cylinder_nodes[off_axis]
+    cylinder_normals = radial[off_axis] * (node_signs[off_axis] / radial_lengths[off_axis])[:, None]
+    
+    # Weld nodes shared between faces (seams) in one pass over the whole mesh
+    vertex_array, node_to_vertex = weld_vertices(all_nodes)
+    triangle_array = node_to_vertex[all_triangles]
+    num_vertices = len(vertex_array)
     
     # PASS 2: Hybrid normal generation (flat for planes, smooth for cylinders)
-    vertex_normals = [0.0] * len(vertices)
-    vertex_normal_counts = [0] * (len(vertices) // 3)  # Track how many normals averaged per vertex
-    num_vertices = len(vertices) // 3
+    # Planar triangles take their face's analytic normal (constant over the face);
+    # only curved-face triangles need a cross product.
+    # The curved/planar split is gathered once and reused by both shading passes
+    triangle_is_curved = ~triangle_is_plane
+    curved_triangles = triangle_array[triangle_is_curved]
+    planar_triangles = triangle_array[triangle_is_plane]
     
-    # First pass: Accumulate normals for each vertex
-    for tri_idx in range(len(indices) // 3):
-        idx0, idx1, idx2 = indices[tri_idx*3], indices[tri_idx*3+1], indices[tri_idx*3+2]
-        
-        v0 = np.array([vertices[idx0*3], vertices[idx0*3+1], vertices[idx0*3+2]])
-        v1 = np.array([vertices[idx1*3], vertices[idx1*3+1], vertices[idx1*3+2]])
-        v2 = np.array([vertices[idx2*3], vertices[idx2*3+1], vertices[idx2*3+2]])
-        
-        # Calculate triangle face normal
-        edge1 = v1 - v0
-        edge2 = v2 - v0
-        face_normal = np.cross(edge1, edge2)
-        
-        length = np.linalg.norm(face_normal)
-        if length > 0:
-            face_normal = face_normal / length
-        else:
-            face_normal = np.array([0, 0, 1])
-        
-        # Get surface type for this triangle
-        surface_type = face_surface_types.get(tri_idx, "cylinder")
-        
-        if surface_type == "plane":
-            # FLAT SHADING: Assign face normal directly (no averaging)
-            for idx in [idx0, idx1, idx2]:
-                vertex_normals[idx*3] = face_normal[0]
-                vertex_normals[idx*3+1] = face_normal[1]
-                vertex_normals[idx*3+2] = face_normal[2]
-                vertex_normal_counts[idx] = -1  # Mark as "locked" - don't average
-        else:
-            # SMOOTH SHADING: Accumulate normals for averaging
-            for idx in [idx0, idx1, idx2]:
-                # Only accumulate if not locked by planar surface
-                if vertex_normal_counts[idx] != -1:
-                    vertex_normals[idx*3] += face_normal[0]
-                    vertex_normals[idx*3+1] += face_normal[1]
-                    vertex_normals[idx*3+2] += face_normal[2]
-                    vertex_normal_counts[idx] += 1
+    curved_normals = unit_triangle_normals(vertex_array, curved_triangles)
     
-    # Second pass: Normalize accumulated normals for cylindrical surfaces
-    for v_idx in range(num_vertices):
-        if vertex_normal_counts[v_idx] > 0:  # Cylindrical vertex - needs normalization
-            nx = vertex_normals[v_idx*3]
-            ny = vertex_normals[v_idx*3+1]
-            nz = vertex_normals[v_idx*3+2]
-            
-            length = math.sqrt(nx*nx + ny*ny + nz*nz)
-            if length > 0:
-                vertex_normals[v_idx*3] = nx / length
-                vertex_normals[v_idx*3+1] = ny / length
-                vertex_normals[v_idx*3+2] = nz / length
+    vertex_normals = np.zeros((num_vertices, 3))
+    
+    # SMOOTH SHADING: sum the normals of all non-planar triangles around each vertex
+    smooth_corners = curved_triangles.ravel()
+    for axis in range(3):
+        vertex_normals[:, axis] = np.bincount(smooth_corners, weights=np.repeat(curved_normals[:, axis], 3),
+                                              minlength=num_vertices)
+    smooth_counts = np.bincount(smooth_corners, minlength=num_vertices)
+    
+    # FLAT SHADING: any vertex on a planar triangle is locked to that face normal
+    # (the last planar triangle touching it wins, as in the per-triangle version)
+    flat_corners = planar_triangles.ravel()
+    locked, last_from_end = np.unique(flat_corners[::-1], return_index=True)
+    last_flat = (len(flat_corners) - 1 - last_from_end) // 3
+    vertex_normals[locked] = planar_normals[last_flat]
+    smooth_counts[locked] = 0
+    
+    # Normalize accumulated normals for cylindrical surfaces
+    smooth = smooth_counts > 0
+    summed_normals = vertex_normals[smooth]
+    squared_lengths = np.einsum('ij,ij->i', summed_normals, summed_normals)
+    nonzero = squared_lengths > 0
+    vertex_normals[np.flatnonzero(smooth)[nonzero]] *= (1.0 / np.sqrt(squared_lengths[nonzero]))[:, None]
+    
+    # Cylinder vertices not locked by a plane use the analytic normal instead of
+    # the triangle average (exact shading, no faceting on coarse cylinders)
+    cylinder_vertices = node_to_vertex[cylinder_nodes]
+    unlocked = smooth[cylinder_vertices]
+    vertex_normals[cylinder_vertices[unlocked]] = cylinder_normals[unlocked]
     
     # Count how many vertices got each treatment
-    planar_vertices = sum(1 for c in vertex_normal_counts if c == -1)
-    cylindrical_vertices = sum(1 for c in vertex_normal_counts if c > 0)
+    planar_vertices = len(locked)
+    cylindrical_vertices = int(smooth.sum())
+    
+    vertices = vertex_array.ravel()
+    indices = triangle_array.ravel().astype(np.uint32)
+    # Unit normals lose nothing visible in single precision, and every consumer
+    # (WebGL buffers, oct encoding) works from float32 anyway. Positions stay
+    # float64: they are welded at 1e-6, which float32 cannot resolve on parts
+    # larger than a few millimetres.
+    vertex_normals = vertex_normals.ravel().astype(np.float32)
     
     logger.info(f"✅ Tessellation complete: {num_vertices} vertices, {len(indices)//3} triangles")
     logger.info(f"   ├─ HYBRID NORMALS: {planar_vertices} planar (flat), {cylindrical_vertices} cylindrical (smooth)")
@@ -512,7 +976,7 @@ def tessellate_shape(shape):
         'normals': vertex_normals
     }
 
-def extract_feature_edges(shape, max_edges=2000, angle_threshold_degrees=20):
+def extract_feature_edges(shape, max_edges=2000, angle_threshold_degrees=20, edge_deflection=0.1):
     """
     Extract significant BREP edges using professional smart filtering with enhanced circular edge detection.
     
@@ -523,8 +987,11 @@ def extract_feature_edges(shape, max_edges=2000, angle_threshold_degrees=20):
     - Boundary edges (silhouettes) are always included
     - This mimics SolidWorks/Fusion 360 edge display behavior
     - Circles use 30 segments per full circle (professional quality)
+    - Lines emit their two endpoints; other curves are sampled by OCCT's
+      GCPnts_UniformDeflection with `edge_deflection` (mm) chord tolerance
     
-    Returns: List of edge polylines [[x,y,z], [x,y,z], ...]
+    Returns: List of edge polylines as (k,3) float64 arrays (rounded to 1 µm);
+    format_mesh_payload() turns them into [[x,y,z], ...] lists for the response.
     """
     angle_threshold_rad = math.radians(angle_threshold_degrees)
     feature_edges = []
@@ -535,6 +1002,20 @@ def extract_feature_edges(shape, max_edges=2000, angle_threshold_degrees=20):
 
     logger.info(f"🔍 Analyzing {edge_face_map.Size()} edges with {angle_threshold_degrees}° threshold (enhanced circular detection)...")
 
+    # Each face borders many edges: build its surface adaptor and mid-UV normal once
+    face_normals = {}
+
+    def face_mid_normal(face):
+        normal = face_normals.get(face)
+        if normal is None:
+            surface = BRepAdaptor_Surface(face)
+            u_mid = (surface.FirstUParameter() + surface.LastUParameter()) / 2
+            v_mid = (surface.FirstVParameter() + surface.LastVParameter()) / 2
+            normal = gp_Vec()
+            BRepGProp_Face(face).Normal(u_mid, v_mid, gp_Pnt(), normal)
+            face_normals[face] = normal
+        return normal
+
     edge_exp = TopExp_Explorer(shape, TopAbs_EDGE)
     edge_count = 0
     significant_count = 0
@@ -545,27 +1026,26 @@ def extract_feature_edges(shape, max_edges=2000, angle_threshold_degrees=20):
         edge = topods.Edge(edge_exp.Current())
         edge_count += 1
 
-        # Get adjacent faces
+        # Get adjacent faces (hashed lookup; the map's keys compare with IsSame)
         adjacent_faces = []
-        for i in range(1, edge_face_map.Size() + 1):
-            if edge.IsSame(edge_face_map.FindKey(i)):
-                face_list = edge_face_map.FindFromIndex(i)
-                face_iter = TopTools_ListIteratorOfListOfShape(face_list)
-                while face_iter.More():
-                    adjacent_faces.append(topods.Face(face_iter.Value()))
-                    face_iter.Next()
-                break
+        edge_index = edge_face_map.FindIndex(edge)
+        if edge_index > 0:
+            face_iter = TopTools_ListIteratorOfListOfShape(edge_face_map.FindFromIndex(edge_index))
+            while face_iter.More():
+                adjacent_faces.append(topods.Face(face_iter.Value()))
+                face_iter.Next()
 
         # Check if this is a feature edge
         is_feature = False
         edge_type = "unknown"
 
         # CRITICAL: Check if this is a circular edge first
+        curve_adaptor = None
         try:
             curve_adaptor = BRepAdaptor_Curve(edge)
             curve_type = curve_adaptor.GetType()
             
-            if curve_type == GeomAbs_Circle:
+            if curve_type == CURVE_CIRCLE:
                 # ALWAYS include circular edges - they define cylindrical/spherical boundaries
                 is_feature = True
                 edge_type = "circular"
@@ -585,32 +1065,8 @@ def extract_feature_edges(shape, max_edges=2000, angle_threshold_degrees=20):
                     face1 = adjacent_faces[0]
                     face2 = adjacent_faces[1]
 
-                    # Get normals at edge midpoint
-                    curve_adaptor = BRepAdaptor_Curve(edge)
-                    u_mid = (curve_adaptor.FirstParameter() + curve_adaptor.LastParameter()) / 2
-                    mid_point = curve_adaptor.Value(u_mid)
-
-                    # Compute normals for both faces at the midpoint
-                    surface1 = BRepAdaptor_Surface(face1)
-                    surface2 = BRepAdaptor_Surface(face2)
-
-                    # Project point onto surfaces to get UV coordinates
-                    props1 = BRepGProp_Face(face1)
-                    props2 = BRepGProp_Face(face2)
-
-                    # Use mid-UV for normal computation
-                    u1_mid = (surface1.FirstUParameter() + surface1.LastUParameter()) / 2
-                    v1_mid = (surface1.FirstVParameter() + surface1.LastVParameter()) / 2
-                    u2_mid = (surface2.FirstUParameter() + surface2.LastUParameter()) / 2
-                    v2_mid = (surface2.FirstVParameter() + surface2.LastVParameter()) / 2
-
-                    normal1 = gp_Vec()
-                    normal2 = gp_Vec()
-                    point1 = gp_Pnt()
-                    point2 = gp_Pnt()
-
-                    props1.Normal(u1_mid, v1_mid, point1, normal1)
-                    props2.Normal(u2_mid, v2_mid, point2, normal2)
+                    normal1 = face_mid_normal(face1)
+                    normal2 = face_mid_normal(face2)
 
                     # Calculate dihedral angle
                     dot_product = normal1.Dot(normal2)
@@ -629,7 +1085,8 @@ def extract_feature_edges(shape, max_edges=2000, angle_threshold_degrees=20):
         if is_feature:
             # Tessellate the edge with professional quality
             try:
-                curve_adaptor = BRepAdaptor_Curve(edge)
+                if curve_adaptor is None:
+                    curve_adaptor = BRepAdaptor_Curve(edge)
                 curve_type = curve_adaptor.GetType()
                 u_first = curve_adaptor.FirstParameter()
                 u_last = curve_adaptor.LastParameter()
@@ -637,30 +1094,31 @@ def extract_feature_edges(shape, max_edges=2000, angle_threshold_degrees=20):
                 # ============================================
                 # 🔥 PROFESSIONAL QUALITY CIRCLE SEGMENTATION
                 # ============================================
-                if curve_type == GeomAbs_Line:
-                    num_samples = 2  # Lines only need 2 points
-                elif curve_type == GeomAbs_Circle:
+                if curve_type == CURVE_LINE:
+                    # Lines only need their endpoints
+                    samples = [curve_adaptor.Value(u_first), curve_adaptor.Value(u_last)]
+                elif curve_type == CURVE_CIRCLE:
                     # Use 30 segments for a full circle (professional quality)
                     arc_angle = u_last - u_first
                     full_circle = 2 * math.pi
                     num_samples = max(2, int(30 * arc_angle / full_circle))
-                elif curve_type in [GeomAbs_BSplineCurve, GeomAbs_BezierCurve]:
-                    # Adaptive sampling for splines
-                    edge_length = GCPnts_AbscissaPoint.Length(curve_adaptor, u_first, u_last)
-                    num_samples = max(2, min(20, int(edge_length / 2)))  # 2-20 samples, one per 2mm
+                    samples = map(curve_adaptor.Value, np.linspace(u_first, u_last, num_samples))
                 else:
-                    # Default for other curve types
-                    edge_length = GCPnts_AbscissaPoint.Length(curve_adaptor, u_first, u_last)
-                    num_samples = max(2, min(20, int(edge_length / 2)))
+                    # Splines and other curves: OCCT picks the parameters in C++ so that the
+                    # chord error stays under edge_deflection (few points on short/flat edges)
+                    sampler = GCPnts_UniformDeflection(curve_adaptor, edge_deflection, u_first, u_last)
+                    if sampler.IsDone() and sampler.NbPoints() >= 2:
+                        samples = map(sampler.Value, range(1, sampler.NbPoints() + 1))
+                    else:
+                        samples = [curve_adaptor.Value(u_first), curve_adaptor.Value(u_last)]
                 # ============================================
 
-                points = []
-                for i in range(num_samples):
-                    u = u_first + (u_last - u_first) * i / (num_samples - 1)
-                    pnt = curve_adaptor.Value(u)
-                    points.append([pnt.X(), pnt.Y(), pnt.Z()])
+                # One Coord() call per point, streamed into the (n,3) array
+                points = np.fromiter((pnt.Coord() for pnt in samples), dtype=XYZ_DTYPE)
 
                 if len(points) >= 2:
+                    # Micron precision is plenty for display lines and keeps the JSON short
+                    np.round(points, 3, out=points)
                     feature_edges.append(points)
                     significant_count += 1
             except:
@@ -676,7 +1134,153 @@ def extract_feature_edges(shape, max_edges=2000, angle_threshold_degrees=20):
     return feature_edges
 
 
-def classify_mesh_faces(mesh_data, shape):
+if NUMBA_AVAILABLE:
+    @njit(cache=True, parallel=True, nogil=True)
+    def _nearest_anchor_kernel(centroids, anchors, radii):
+        """Compiled O(triangles x faces) scan, parallel over triangles; strict '<' keeps the first minimum."""
+        nearest = np.full(centroids.shape[0], -1, dtype=np.int64)
+        for t in prange(centroids.shape[0]):
+            best = np.inf
+            cx = centroids[t, 0]
+            cy = centroids[t, 1]
+            cz = centroids[t, 2]
+            for f in range(anchors.shape[0]):
+                dx = cx - anchors[f, 0]
+                dy = cy - anchors[f, 1]
+                dz = cz - anchors[f, 2]
+                dist = abs(math.sqrt(dx * dx + dy * dy + dz * dz) - radii[f])
+                if dist < best:
+                    best = dist
+                    nearest[t] = f
+        return nearest
+
+
+def find_nearest_brep_faces(centroids, anchors, radii):
+    """
+    For every triangle centroid, return the index of the closest BREP face.
+
+    Each face is reduced to an anchor point and a radius: cylinders use their
+    axis location and radius, planes their center and 0, so the distance is
+    |‖centroid - anchor‖ - radius| for both. Returns -1 where no face exists.
+    """
+    centroids = np.ascontiguousarray(centroids, dtype=np.float64)
+    anchors = np.ascontiguousarray(anchors, dtype=np.float64).reshape(-1, 3)
+    radii = np.ascontiguousarray(radii, dtype=np.float64)
+
+    if len(anchors) == 0:
+        return np.full(len(centroids), -1, dtype=np.int64)
+
+    if NUMBA_AVAILABLE:
+        return _nearest_anchor_kernel(centroids, anchors, radii)
+
+    # NumPy fallback: blocks of triangles keep each distance matrix ~1M entries;
+    # blocks are independent, so they are spread over MESH_WORKERS threads
+    nearest = np.empty(len(centroids), dtype=np.int64)
+    block = max(1, 1_000_000 // len(anchors))
+
+    def search_block(start):
+        chunk = centroids[start:start + block]
+        diff = chunk[:, None, :] - anchors[None, :, :]
+        dist = np.abs(np.sqrt(np.einsum('ijk,ijk->ij', diff, diff)) - radii[None, :])
+        nearest[start:start + block] = np.argmin(dist, axis=1)
+
+    starts = range(0, len(centroids), block)
+    if MESH_WORKERS > 1 and len(starts) > 1:
+        with ThreadPoolExecutor(max_workers=MESH_WORKERS) as executor:
+            list(executor.map(search_block, starts))
+    else:
+        for start in starts:
+            search_block(start)
+    return nearest
+
+
+def propagate_mesh_classes(indices, face_classes, vertex_classes, locked,
+                           v2f_start, v2f_tris, max_iterations):
+    """
+    Multi-pass neighbor propagation of MESH_CLASS_* ids with face locking.
+
+    Updates `face_classes`, `vertex_classes` and `locked` in place, one triangle
+    at a time (later triangles see earlier updates within the same pass).
+    Written so the same code runs on Python lists or, compiled by Numba, on
+    arrays. Returns (iterations run, converged).
+    """
+    num_triangles = len(face_classes)
+    changes_made = True
+    iterations = 0
+
+    while changes_made and iterations < max_iterations:
+        changes_made = False
+        iterations += 1
+
+        for tri_idx in range(num_triangles):
+            if locked[tri_idx]:
+                continue
+
+            current_type = face_classes[tri_idx]
+
+            # Count neighbor face types
+            n_external = 0
+            n_internal = 0
+            n_through = 0
+            n_planar = 0
+            for corner in range(3):
+                v_idx = indices[tri_idx * 3 + corner]
+                for k in range(v2f_start[v_idx], v2f_start[v_idx + 1]):
+                    neighbor_tri = v2f_tris[k]
+                    if neighbor_tri != tri_idx:
+                        neighbor_type = face_classes[neighbor_tri]
+                        if neighbor_type == MESH_CLASS_EXTERNAL:
+                            n_external += 1
+                        elif neighbor_type == MESH_CLASS_INTERNAL:
+                            n_internal += 1
+                        elif neighbor_type == MESH_CLASS_THROUGH:
+                            n_through += 1
+                        else:
+                            n_planar += 1
+
+            if n_external + n_internal + n_through + n_planar == 0:
+                continue
+
+            # Propagation rules
+            new_type = current_type
+            if current_type == MESH_CLASS_EXTERNAL:
+                # External faces can change to internal/through if surrounded
+                if n_internal >= 2:
+                    new_type = MESH_CLASS_INTERNAL
+                elif n_through >= 2:
+                    new_type = MESH_CLASS_THROUGH
+
+            elif current_type == MESH_CLASS_PLANAR:
+                # Planar faces can change if strongly surrounded
+                if n_internal >= 3:
+                    new_type = MESH_CLASS_INTERNAL
+                elif n_through >= 3:
+                    new_type = MESH_CLASS_THROUGH
+
+            elif current_type == MESH_CLASS_INTERNAL:
+                # Internal faces next to external ones are correctly classified - lock
+                if n_external > 0:
+                    locked[tri_idx] = True
+
+            elif current_type == MESH_CLASS_THROUGH:
+                # Through-hole faces are high confidence - lock them
+                locked[tri_idx] = True
+
+            # Update face and its vertices if changed
+            if current_type != new_type:
+                face_classes[tri_idx] = new_type
+                for corner in range(3):
+                    vertex_classes[indices[tri_idx * 3 + corner]] = new_type
+                changes_made = True
+
+    return iterations, not changes_made
+
+
+if NUMBA_AVAILABLE:
+    _propagate_mesh_classes_kernel = njit(cache=True, nogil=True)(propagate_mesh_classes)
+
+
+def classify_mesh_faces(mesh_data, shape, faces=None, bbox=None):
     """
     MESH-BASED surface classification using vertex position and face neighbor propagation.
     
@@ -686,235 +1290,692 @@ def classify_mesh_faces(mesh_data, shape):
     3. Uses multi-pass propagation to fix misclassifications
     4. Locks classified regions to prevent overwriting
     
-    Returns: List of color types for each vertex ["external", "internal", "through", "planar"]
+    `faces` is the table from collect_faces() and `bbox` the shape's bounding box
+    tuple; each is computed here if not supplied.
+
+    Returns: int8 array with one MESH_CLASS_* id per vertex (-1 if the vertex is
+    not used by any triangle); mesh_class_labels() turns it into the
+    "external"/"internal"/"through"/"planar" strings sent to the frontend.
     """
-    vertices = mesh_data['vertices']
-    indices = mesh_data['indices']
-    num_vertices = len(vertices) // 3
-    num_triangles = len(indices) // 3
+    vertex_array = np.asarray(mesh_data['vertices'], dtype=np.float64).reshape(-1, 3)
+    triangle_array = np.asarray(mesh_data['indices'], dtype=np.int64).reshape(-1, 3)
+    num_vertices = len(vertex_array)
+    num_triangles = len(triangle_array)
 
     logger.info(f"🎨 Starting MESH-BASED classification: {num_vertices} vertices, {num_triangles} faces")
 
-    # Initialize with None (unclassified)
-    vertex_colors = [None] * num_vertices
-    face_classifications = [None] * num_triangles
-
-    # Build face-to-vertex and vertex-to-face maps
-    vertex_to_faces = [[] for _ in range(num_vertices)]
-    for tri_idx in range(num_triangles):
-        v1 = indices[tri_idx * 3]
-        v2 = indices[tri_idx * 3 + 1]
-        v3 = indices[tri_idx * 3 + 2]
-        vertex_to_faces[v1].append(tri_idx)
-        vertex_to_faces[v2].append(tri_idx)
-        vertex_to_faces[v3].append(tri_idx)
-
-    # Get manufacturing features for reference
-    features = recognize_manufacturing_features(shape)
-    internal_cylinders = features['through_holes'] + features['blind_holes'] + features['bores']
+    # Vertex-to-face map in CSR form: the triangles around vertex v are
+    # v2f_tris[v2f_start[v]:v2f_start[v + 1]], in ascending order
+    flat_indices = triangle_array.ravel()
+    v2f_tris = np.argsort(flat_indices, kind='stable') // 3
+    v2f_start = np.zeros(num_vertices + 1, dtype=np.int64)
+    np.cumsum(np.bincount(flat_indices, minlength=num_vertices), out=v2f_start[1:])
 
-    bbox_diagonal, bbox = calculate_bbox_diagonal(shape)
+    bbox_diagonal, bbox = calculate_bbox_diagonal(shape, bbox)
     bbox_center = [(bbox[0] + bbox[3]) / 2, (bbox[1] + bbox[4]) / 2, (bbox[2] + bbox[5]) / 2]
 
     # Step 1: Classify each mesh face by projecting to BREP
-    face_exp = TopExp_Explorer(shape, TopAbs_FACE)
-    brep_faces = []
-    while face_exp.More():
-        brep_faces.append(topods.Face(face_exp.Current()))
-        face_exp.Next()
-
-    for tri_idx in range(num_triangles):
-        v1_idx = indices[tri_idx * 3]
-        v2_idx = indices[tri_idx * 3 + 1]
-        v3_idx = indices[tri_idx * 3 + 2]
-
-        # Get triangle centroid
-        cx = (vertices[v1_idx*3] + vertices[v2_idx*3] + vertices[v3_idx*3]) / 3
-        cy = (vertices[v1_idx*3+1] + vertices[v2_idx*3+1] + vertices[v3_idx*3+1]) / 3
-        cz = (vertices[v1_idx*3+2] + vertices[v2_idx*3+2] + vertices[v3_idx*3+2]) / 3
-        centroid = [cx, cy, cz]
-
-        # Find closest BREP face
-        min_dist = float('inf')
-        closest_face = None
-
-        for brep_face in brep_faces:
-            surface = BRepAdaptor_Surface(brep_face)
-            surf_type = surface.GetType()
-
-            if surf_type == GeomAbs_Cylinder:
-                cyl = surface.Cylinder()
-                axis_pos = cyl.Axis().Location()
-                axis_point = [axis_pos.X(), axis_pos.Y(), axis_pos.Z()]
-                radius = cyl.Radius()
-
-                # Distance from centroid to cylinder axis
-                dist_to_axis = math.sqrt(
-                    (centroid[0] - axis_point[0])**2 +
-                    (centroid[1] - axis_point[1])**2 +
-                    (centroid[2] - axis_point[2])**2
-                )
-
-                dist_to_surface = abs(dist_to_axis - radius)
-
-                if dist_to_surface < min_dist:
-                    min_dist = dist_to_surface
-                    closest_face = (brep_face, surf_type, radius, axis_point)
-
-            elif surf_type == GeomAbs_Plane:
-                # For planes, check distance to face center
-                face_props = GProp_GProps()
-                brepgprop.SurfaceProperties(brep_face, face_props)
-                face_center = face_props.CentreOfMass()
-
-                dist = math.sqrt(
-                    (centroid[0] - face_center.X())**2 +
-                    (centroid[1] - face_center.Y())**2 +
-                    (centroid[2] - face_center.Z())**2
-                )
-
-                if dist < min_dist:
-                    min_dist = dist
-                    closest_face = (brep_face, surf_type, None, None)
-
-        # Classify based on closest face
-        if closest_face is not None:
-            _, surf_type, radius, axis_point = closest_face
-
-            if surf_type == GeomAbs_Cylinder and radius is not None:
-                # Check if internal or external
-                dist_axis_to_bbox = math.sqrt(
-                    (axis_point[0] - bbox_center[0])**2 +
-                    (axis_point[1] - bbox_center[1])**2 +
-                    (axis_point[2] - bbox_center[2])**2
-                )
-
-                dist_centroid_to_axis = math.sqrt(
-                    (centroid[0] - axis_point[0])**2 +
-                    (centroid[1] - axis_point[1])**2 +
-                    (centroid[2] - axis_point[2])**2
-                )
-
-                # Internal if closer to axis than bbox center
-                if dist_centroid_to_axis < dist_axis_to_bbox:
-                    # Check if it's a through-hole (small internal cylinder)
-                    bbox_size = max(bbox[3] - bbox[0], bbox[4] - bbox[1], bbox[5] - bbox[2])
-                    diameter_ratio = (radius * 2) / bbox_size
-
-                    if diameter_ratio < 0.15:
-                        face_classifications[tri_idx] = "through"
-                    else:
-                        face_classifications[tri_idx] = "internal"
-                else:
-                    face_classifications[tri_idx] = "external"
-
-            elif surf_type == GeomAbs_Plane:
-                face_classifications[tri_idx] = "planar"
+    # Cylinder axes/radii and plane centers come straight from the face table,
+    # so the per-triangle search below never calls back into OCC.
+    if faces is None:
+        faces = collect_faces(shape)
 
-            else:
-                face_classifications[tri_idx] = "external"
-        else:
-            face_classifications[tri_idx] = "external"
-
-        # Assign to vertices
-        classification = face_classifications[tri_idx] or "external"
-        vertex_colors[v1_idx] = classification
-        vertex_colors[v2_idx] = classification
-        vertex_colors[v3_idx] = classification
+    brep_faces = []
+    for record in faces:
+        if record['type'] == SURF_CYLINDER:
+            brep_faces.append((SURF_CYLINDER, record['radius'], record['position']))
+        elif record['type'] == SURF_PLANE:
+            brep_faces.append((SURF_PLANE, None, record['center']))
+
+    # Triangle centroids and closest-face search run as array kernels
+    centroids = vertex_array[triangle_array].mean(axis=1)
+    nearest_faces = find_nearest_brep_faces(
+        centroids,
+        [anchor for _, _, anchor in brep_faces],
+        [radius or 0.0 for _, radius, _ in brep_faces]
+    )
+
+    # Per-BREP-face attributes, plus a trailing sentinel row so that
+    # nearest_faces == -1 (no candidate face) indexes an "external" entry.
+    num_brep = len(brep_faces)
+    face_kinds = np.full(num_brep + 1, FACE_KIND_OTHER, dtype=np.int8)
+    radii = np.zeros(num_brep + 1)
+    anchors = np.zeros((num_brep + 1, 3))
+    for i, (surf_type, radius, anchor) in enumerate(brep_faces):
+        face_kinds[i] = FACE_KIND_CYLINDER if surf_type == SURF_CYLINDER else FACE_KIND_PLANE
+        radii[i] = radius or 0.0
+        anchors[i] = anchor
+
+    bbox_size = max(bbox[3] - bbox[0], bbox[4] - bbox[1], bbox[5] - bbox[2])
+    axis_offsets = anchors - bbox_center
+    dist_axis_to_bbox = np.sqrt(np.einsum('ij,ij->i', axis_offsets, axis_offsets))
+    is_small = radii * 2 < 0.15 * bbox_size  # diameter_ratio < 0.15
+
+    # Table-driven classification: a triangle is inside if it is closer to the
+    # face's axis than the axis is to the bbox center; MESH_CLASS_TABLE turns
+    # (face kind, inside, small) into the class id in one lookup.
+    centroid_offsets = centroids - anchors[nearest_faces]
+    dist_centroid_to_axis = np.sqrt(np.einsum('ij,ij->i', centroid_offsets, centroid_offsets))
+    is_inside = dist_centroid_to_axis < dist_axis_to_bbox[nearest_faces]
+    class_ids = MESH_CLASS_TABLE[face_kinds[nearest_faces], is_inside.view(np.int8),
+                                 is_small[nearest_faces].view(np.int8)]
+
+    # Each vertex takes the class of the last triangle that references it
+    vertex_colors = np.full(num_vertices, -1, dtype=np.int8)
+    referenced, last_from_end = np.unique(flat_indices[::-1], return_index=True)
+    last_triangle = (len(flat_indices) - 1 - last_from_end) // 3
+    vertex_colors[referenced] = class_ids[last_triangle]
 
     # Step 2: Multi-pass neighbor propagation with face locking
     logger.info("🔄 Starting multi-pass propagation to fix misclassifications...")
     max_iterations = 5
-    locked_faces = set()
+    if NUMBA_AVAILABLE:
+        # Updates class_ids and vertex_colors in place
+        iterations, converged = _propagate_mesh_classes_kernel(
+            flat_indices, class_ids, vertex_colors,
+            np.zeros(num_triangles, dtype=np.bool_), v2f_start, v2f_tris, max_iterations
+        )
+    else:
+        # Plain Python lists: element access on them is much cheaper than on arrays
+        vertex_color_list = vertex_colors.tolist()
+        iterations, converged = propagate_mesh_classes(
+            flat_indices.tolist(), class_ids.tolist(), vertex_color_list, [False] * num_triangles,
+            v2f_start.tolist(), v2f_tris.tolist(), max_iterations
+        )
+        vertex_colors = np.array(vertex_color_list, dtype=np.int8)
 
-    for iteration in range(max_iterations):
-        changes_made = False
+    if converged:
+        logger.info(f"  Propagation converged after {iterations} iterations")
+    else:
+        logger.info(f"  Propagation stopped at max iterations ({max_iterations})")
 
-        for tri_idx in range(num_triangles):
-            if tri_idx in locked_faces:
-                continue
+    # Count results
+    class_counts = np.bincount(vertex_colors[vertex_colors >= 0], minlength=len(MESH_CLASS_LABELS))
+    type_counts = dict(zip(MESH_CLASS_LABELS, class_counts.tolist()))
+    logger.info(f"✅ Classification complete! Distribution: {type_counts}")
 
-            current_type = face_classifications[tri_idx]
-            if current_type is None:
-                continue
+    return vertex_colors
 
-            # Get neighbor face types
-            neighbor_types = []
-            v1 = indices[tri_idx * 3]
-            v2 = indices[tri_idx * 3 + 1]
-            v3 = indices[tri_idx * 3 + 2]
 
-            for v_idx in [v1, v2, v3]:
-                for neighbor_tri in vertex_to_faces[v_idx]:
-                    if neighbor_tri != tri_idx and face_classifications[neighbor_tri] is not None:
-                        neighbor_types.append(face_classifications[neighbor_tri])
+def mesh_class_labels(class_ids):
+    """Map MESH_CLASS_* ids to their label strings (-1 -> None) for the JSON response"""
+    return _MESH_CLASS_LABEL_LUT[np.asarray(class_ids)].tolist()
 
-            if not neighbor_types:
-                continue
 
-            # Count neighbor types
-            type_counts = {}
-            for ntype in neighbor_types:
-                type_counts[ntype] = type_counts.get(ntype, 0) + 1
+def oct_encode_normals(normals, dtype='<i2'):
+    """
+    Octahedral-encode unit normals into two signed integers per normal.
 
-            # Propagation rules
-            if current_type == "external":
-                # External faces can change to internal/through if surrounded
-                if "internal" in neighbor_types and type_counts.get("internal", 0) >= 2:
-                    new_type = "internal"
-                elif "through" in neighbor_types and type_counts.get("through", 0) >= 2:
-                    new_type = "through"
-                else:
-                    new_type = current_type
+    Project onto the octahedron |x|+|y|+|z| = 1, fold the lower hemisphere over
+    the diagonals, then quantize x/y to the full symmetric range of `dtype`
+    (int16: [-32767, 32767], int8: [-127, 127]). Decoding on the GPU is
+    n = (x, y, 1 - |x| - |y|); if n.z < 0: n.xy = (1 - |n.yx|) * sign(n.xy).
+    """
+    n = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+    l1 = np.abs(n).sum(axis=1)
+    l1[l1 == 0] = 1.0
+    p = n[:, :2] / l1[:, None]
 
-            elif current_type == "planar":
-                # Planar faces can change if strongly surrounded
-                if "internal" in neighbor_types and type_counts.get("internal", 0) >= 3:
-                    new_type = "internal"
-                elif "through" in neighbor_types and type_counts.get("through", 0) >= 3:
-                    new_type = "through"
-                else:
-                    new_type = current_type
+    lower = n[:, 2] < 0
+    sign_not_zero = np.where(p[lower] >= 0, 1.0, -1.0)
+    p[lower] = (1.0 - np.abs(p[lower][:, ::-1])) * sign_not_zero
 
-            elif current_type == "internal":
-                # Internal faces can propagate to adjacent external
-                if "external" in neighbor_types:
-                    # Lock this face - it's correctly classified
-                    locked_faces.add(tri_idx)
-                new_type = current_type
+    return np.rint(np.clip(p, -1.0, 1.0) * np.iinfo(dtype).max).astype(dtype)
 
-            elif current_type == "through":
-                # Through-hole faces are high confidence - lock them
-                locked_faces.add(tri_idx)
-                new_type = current_type
 
-            else:
-                new_type = current_type
+def quantize_positions(vertices):
+    """
+    Quantize positions to uint16 steps across their own bounding box.
 
-            # Update if changed
-            if current_type != new_type:
-                face_classifications[tri_idx] = new_type
+    Returns (quantized (v,3) uint16, origin, scale); the client decodes
+    position = origin + q * scale per axis. The error is at most half a step,
+    i.e. 1/131070 of the part's extent along that axis.
+    """
+    v = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    if len(v) == 0:
+        return np.empty((0, 3), dtype='<u2'), [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]
 
-                # Update vertices
-                for v_offset in range(3):
-                    v_idx = indices[tri_idx * 3 + v_offset]
-                    vertex_colors[v_idx] = new_type
+    origin = v.min(axis=0)
+    scale = (v.max(axis=0) - origin) / 65535.0
+    # Flat axes (every vertex at the same coordinate) quantize to 0
+    steps = np.divide(v - origin, scale, out=np.zeros_like(v), where=scale > 0)
+    return np.rint(steps).astype('<u2'), origin.tolist(), scale.tolist()
 
-                changes_made = True
 
-        if not changes_made:
-            logger.info(f"  Propagation converged after {iteration + 1} iterations")
+def encode_mesh_arrays(vertices, indices, normals, vertex_encoding="float32", normal_encoding="float32",
+                       index_encoding="uint32"):
+    """
+    Convert mesh arrays to their little-endian wire types.
+
+    Returns ([(name, array, dtype name), ...] for vertices, indices and normals,
+    extra metadata the client needs to decode them).
+    vertex_encoding: 'float32' or 'uint16' (see quantize_positions, adds
+    'vertex_origin'/'vertex_scale'); normal_encoding: 'float32', 'oct16' or
+    'oct8' (see oct_encode_normals); index_encoding: 'uint32' or 'auto', which
+    sends uint16 indices when every index is below 0xFFFF (metadata 'index_encoding'
+    is the type actually sent).
+    """
+    metadata = {'vertex_encoding': vertex_encoding, 'normal_encoding': normal_encoding}
+
+    if vertex_encoding == "uint16":
+        vertex_buffer, metadata['vertex_origin'], metadata['vertex_scale'] = quantize_positions(vertices)
+        vertex_dtype = 'uint16'
+    else:
+        vertex_buffer, vertex_dtype = np.asarray(vertices, dtype='<f4'), 'float32'
+
+    if normal_encoding == "oct16":
+        normal_buffer, normal_dtype = oct_encode_normals(normals, '<i2'), 'int16'
+    elif normal_encoding == "oct8":
+        normal_buffer, normal_dtype = oct_encode_normals(normals, 'i1'), 'int8'
+    else:
+        normal_buffer, normal_dtype = np.asarray(normals, dtype='<f4'), 'float32'
+
+    # 0xFFFF is WebGL2's primitive-restart index for UNSIGNED_SHORT draws, so
+    # uint16 is only safe while every index stays below it
+    vertex_count = len(vertices) // 3
+    if index_encoding == "auto" and vertex_count <= np.iinfo(np.uint16).max:
+        index_buffer, index_dtype = np.asarray(indices, dtype='<u2'), 'uint16'
+    else:
+        index_buffer, index_dtype = np.asarray(indices, dtype='<u4'), 'uint32'
+    metadata['index_encoding'] = index_dtype
+
+    arrays = [
+        ('vertices', vertex_buffer, vertex_dtype),
+        ('indices', index_buffer, index_dtype),
+        ('normals', normal_buffer, normal_dtype),
+    ]
+    return arrays, metadata
+
+
+def b64_buffer(array):
+    """Base64 text of a contiguous array's raw bytes, read in place (no tobytes() copy)"""
+    return base64.b64encode(np.ascontiguousarray(array).data).decode('ascii')
+
+
+def encode_mesh_buffers(vertices, indices, normals, vertex_encoding="float32", normal_encoding="float32",
+                        index_encoding="uint32"):
+    """
+    Pack mesh arrays as base64 strings of little-endian typed-array buffers.
+
+    The browser decodes them straight into typed arrays for BufferGeometry:
+    new Float32Array(Uint8Array.from(atob(b64), c => c.charCodeAt(0)).buffer)
+
+    Default (float32) buffers are 'vertices_b64'/'normals_b64'; other encodings
+    are named after the encoding, e.g. 'vertices_uint16_b64' or
+    'normals_oct16_b64'; uint16 indices are 'indices_uint16_b64' (see
+    encode_mesh_arrays).
+    """
+    arrays, metadata = encode_mesh_arrays(vertices, indices, normals, vertex_encoding, normal_encoding,
+                                          index_encoding)
+    vertex_buffer, index_buffer, normal_buffer = (array for _, array, _ in arrays)
+    # Element types actually packed, as vertex_index_normal; the all-default
+    # buffers keep their original 'base64_float32_uint32_le' name
+    packed_dtypes = tuple(dtype for _, _, dtype in arrays)
+    if packed_dtypes == ('float32', 'uint32', 'float32'):
+        buffer_encoding = 'base64_float32_uint32_le'
+    else:
+        buffer_encoding = f"base64_{'_'.join(packed_dtypes)}_le"
+
+    vertex_key = "vertices_b64" if vertex_encoding == "float32" else f"vertices_{vertex_encoding}_b64"
+    normal_key = "normals_b64" if normal_encoding == "float32" else f"normals_{normal_encoding}_b64"
+    index_key = "indices_b64" if metadata['index_encoding'] == "uint32" else "indices_uint16_b64"
+    return {
+        vertex_key: b64_buffer(vertex_buffer),
+        index_key: b64_buffer(index_buffer),
+        normal_key: b64_buffer(normal_buffer),
+        'vertex_count': vertex_buffer.size // 3,
+        'index_count': index_buffer.size,
+        'buffer_encoding': buffer_encoding,
+        **metadata
+    }
+
+
+def build_mesh_octet_stream(payload, vertex_encoding="float32", normal_encoding="float32", index_encoding="uint32"):
+    """
+    Serialize an analysis payload as one binary body for mesh_format=octet.
+
+    Layout: uint32 LE header length, then a UTF-8 JSON header (the payload
+    without the mesh arrays, space-padded to a 4-byte boundary), then the raw
+    little-endian vertex, index and normal buffers, each starting on a 4-byte
+    boundary. mesh_data.buffers in the header lists each buffer's byte offset
+    (from the start of the body), length and element type, so the client can
+    view them as typed arrays without copying. Returns (body bytes, vertex
+    count, index count).
+    """
+    mesh = dict(payload['mesh_data'])
+    arrays, metadata = encode_mesh_arrays(mesh.pop('vertices'), mesh.pop('indices'), mesh.pop('normals'),
+                                          vertex_encoding, normal_encoding, index_encoding)
+    mesh.update(metadata)
+
+    def header_bytes(data_start):
+        buffers = {}
+        offset = data_start
+        for name, array, dtype in arrays:
+            buffers[name] = {'offset': offset, 'byte_length': array.nbytes, 'dtype': dtype}
+            offset += (array.nbytes + 3) // 4 * 4
+        mesh['buffers'] = buffers
+        header = {**payload, 'mesh_data': mesh}
+        return json.dumps(header, separators=(',', ':')).encode('utf-8')
+
+    # Offsets are part of the header: grow the data start until the header fits
+    # in front of it, then pad the header out to it
+    data_start = 4
+    while True:
+        header = header_bytes(data_start)
+        needed = 4 + (len(header) + 3) // 4 * 4
+        if needed <= data_start:
             break
-        elif iteration == max_iterations - 1:
-            logger.info(f"  Propagation stopped at max iterations ({max_iterations})")
+        data_start = needed
+    header = header.ljust(data_start - 4)
 
-    # Count results
-    type_counts = {}
-    for vtype in vertex_colors:
-        type_counts[vtype] = type_counts.get(vtype, 0) + 1
-    logger.info(f"✅ Classification complete! Distribution: {type_counts}")
+    parts = [np.uint32(len(header)).astype('<u4').tobytes(), header]
+    for _, array, _ in arrays:
+        parts.append(np.ascontiguousarray(array).data)  # join() reads the buffer in place
+        parts.append(b'\0' * (-array.nbytes % 4))
+    return b''.join(parts), arrays[0][1].size // 3, arrays[1][1].size
 
-    return vertex_colors
+
+def analysis_cache_path(key):
+    """File in ANALYSIS_CACHE_DIR for a (file hash, *params) cache key"""
+    params = hashlib.sha256(repr(key[1:]).encode('ascii')).hexdigest()[:16]
+    return os.path.join(ANALYSIS_CACHE_DIR, f"{key[0]}_{params}.npz")
+
+
+MESH_ARRAY_KEYS = ('vertices', 'indices', 'normals', 'vertex_colors')
+
+
+def json_scalar(value):
+    """json.dumps() default for NumPy scalars left in an analysis result"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def pack_analysis(result):
+    """
+    Split an analysis result into plain arrays for np.savez (no pickled objects).
+
+    Mesh arrays are stored as they are, feature-edge polylines as one (n,3)
+    point array plus per-edge lengths, and everything else as UTF-8 JSON.
+    """
+    arrays = {}
+    header = dict(result)
+    mesh = result['mesh_data']
+    if mesh is not None:
+        mesh = dict(mesh)
+        for key in MESH_ARRAY_KEYS:
+            arrays[key] = np.asarray(mesh.pop(key))
+        edges = mesh.pop('feature_edges')
+        arrays['edge_points'] = np.concatenate(edges) if edges else np.empty((0, 3))
+        arrays['edge_lengths'] = np.array([len(points) for points in edges], dtype=np.int64)
+        header['mesh_data'] = mesh
+    arrays['header'] = np.frombuffer(json.dumps(header, default=json_scalar).encode('utf-8'), dtype=np.uint8)
+    return arrays
+
+
+def unpack_analysis(data):
+    """Rebuild an analysis result from the arrays written by pack_analysis()"""
+    result = json.loads(data['header'].tobytes().decode('utf-8'))
+    mesh = result['mesh_data']
+    if mesh is not None:
+        for key in MESH_ARRAY_KEYS:
+            mesh[key] = data[key]
+        split_at = np.cumsum(data['edge_lengths'])[:-1]
+        mesh['feature_edges'] = np.split(data['edge_points'], split_at) if len(data['edge_lengths']) else []
+    return result
+
+
+def load_analysis_file(key):
+    """Read a persisted analysis for `key` (marking it recently used), or None"""
+    if not ANALYSIS_CACHE_DIR:
+        return None
+    path = analysis_cache_path(key)
+    try:
+        # allow_pickle=False: a file planted in the directory can't run code
+        with np.load(path, allow_pickle=False) as data:
+            result = unpack_analysis(data)
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"⚠️ Ignoring unreadable cache file {path}: {e}")
+        return None
+    return result
+
+
+def store_analysis_file(key, result):
+    """Persist an analysis result, then trim the directory to its size budget"""
+    tmp_path = None
+    try:
+        os.makedirs(ANALYSIS_CACHE_DIR, exist_ok=True)
+        # Write to a temporary name and rename, so readers never see a partial file
+        with tempfile.NamedTemporaryFile(dir=ANALYSIS_CACHE_DIR, suffix='.tmp', delete=False) as f:
+            tmp_path = f.name
+            np.savez(f, **pack_analysis(result))
+        os.replace(tmp_path, analysis_cache_path(key))
+        tmp_path = None
+        prune_analysis_files()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not persist analysis to {ANALYSIS_CACHE_DIR}: {e}")
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def prune_analysis_files():
+    """Delete the least recently used cache files until the directory fits its budget"""
+    entries = []
+    for entry in os.scandir(ANALYSIS_CACHE_DIR):
+        if entry.name.endswith('.npz'):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= ANALYSIS_CACHE_DIR_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Another worker pruned it first
+        total -= size
+
+
+def get_cached_analysis(key):
+    """Return the cached analysis for `key` (marking it recently used), or None"""
+    with _analysis_cache_lock:
+        result = _analysis_cache.get(key)
+        if result is not None:
+            _analysis_cache.move_to_end(key)
+            return result
+
+    result = load_analysis_file(key)
+    if result is not None:
+        cache_analysis(key, result, persist=False)
+    return result
+
+
+def cache_analysis(key, result, persist=True):
+    """
+    Store an analysis result, evicting the least recently used entries.
+
+    With `persist`, it is also written to ANALYSIS_CACHE_DIR (when configured).
+    """
+    if persist and ANALYSIS_CACHE_DIR:
+        store_analysis_file(key, result)
+    if ANALYSIS_CACHE_SIZE <= 0:
+        return
+    with _analysis_cache_lock:
+        _analysis_cache[key] = result
+        _analysis_cache.move_to_end(key)
+        while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+
+
+def get_cached_response(key):
+    """Return the cached (body, mimetype, headers) for `key` (marking it recently used), or None"""
+    with _response_cache_lock:
+        response = _response_cache.get(key)
+        if response is not None:
+            _response_cache.move_to_end(key)
+        return response
+
+
+def cache_response(key, response):
+    """Store a serialized (body, mimetype, headers) response, evicting the least recently used"""
+    if RESPONSE_CACHE_SIZE <= 0:
+        return
+    with _response_cache_lock:
+        _response_cache[key] = response
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > RESPONSE_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
+
+class StepReadError(ValueError):
+    """Raised when an uploaded STEP file cannot be read"""
+
+
+def write_step_tempfile(step_bytes):
+    """
+    Write the upload where STEPControl_Reader can open it; returns the path.
+
+    pythonOCC only exposes the path-based ReadFile(), so the bytes must land in
+    a file. STEP_TMP_DIR (tmpfs /dev/shm by default) keeps that round trip in
+    memory; if it is missing or full, the regular temp directory is used.
+    """
+    for directory in (STEP_TMP_DIR, None):
+        if directory is not None and not os.path.isdir(directory):
+            continue
+        # mkstemp itself fails on a read-only or inode-exhausted tmpfs, so it is
+        # inside the try as well
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(suffix=".step", dir=directory)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(step_bytes)
+            return tmp_path
+        except OSError as e:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            if directory is None:
+                raise
+            logger.warning(f"⚠️ Could not stage upload in {directory} ({e}), using the default temp dir")
+
+
+def analyze_step_bytes(step_bytes, quality=DEFAULT_MESH_QUALITY,
+                       angular_deflection_deg=DEFAULT_ANGULAR_DEFLECTION_DEG, include_mesh=True):
+    """
+    Parse a STEP file, analyze BREP geometry and generate the display mesh.
+
+    Returns the /analyze-cad response payload; mesh vertices/indices/normals are
+    NumPy arrays (compact in the cache and across the worker pipe) and are
+    serialized by format_mesh_payload().
+    The result does not depend on anything else in the request, which is what
+    makes it safe to cache by file content.
+
+    With include_mesh=False, tessellation, mesh classification and edge
+    extraction are skipped and 'mesh_data' is None; volumes, features and
+    dimensions are still computed (for quoting-only callers).
+    """
+    tmp_path = write_step_tempfile(step_bytes)
+    try:
+        reader = STEPControl_Reader()
+        status = reader.ReadFile(tmp_path)
+        if status != 1:
+            raise StepReadError("Failed to read STEP file")
+        reader.TransferRoots()
+        shape = reader.OneShape()
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+    logger.info("🔍 Analyzing BREP geometry...")
+    exact_props = calculate_exact_volume_and_area(shape)
+    bbox_diagonal, bbox = calculate_bbox_diagonal(shape)
+
+    if include_mesh:
+        # Mesh first so the face table takes per-face area/center from the triangulation
+        logger.info(f"🎨 Generating display mesh (quality={quality}, {angular_deflection_deg}° angular deflection)...")
+        mesh_shape(shape, bbox, quality, angular_deflection_deg)
+    faces = collect_faces(shape)
+
+    if include_mesh:
+        # Welding, normals and classification spend their time in NumPy/Numba kernels
+        # that release the GIL, so the OCCT-bound edge extraction runs alongside all
+        # of them. The shape is already meshed, so nothing below mutates it.
+        with ThreadPoolExecutor(max_workers=1) as edge_pool:
+            logger.info("📐 Extracting significant BREP edges with 30 segments/circle...")
+            edge_future = edge_pool.submit(extract_feature_edges, shape, max_edges=500, angle_threshold_degrees=20,
+                                           edge_deflection=bbox_diagonal * 0.0005)
+
+            manufacturing_features = recognize_manufacturing_features(shape, faces, bbox)
+            mesh_data = tessellate_shape(shape, faces, bbox, quality, angular_deflection_deg, remesh=False)
+
+            logger.info("🎨 Classifying face colors using MESH-BASED approach...")
+            vertex_colors = classify_mesh_faces(mesh_data, shape, faces, bbox)
+            mesh_data["vertex_colors"] = vertex_colors
+
+            feature_edges = edge_future.result()
+        mesh_data["feature_edges"] = feature_edges
+        mesh_data["triangle_count"] = len(mesh_data.get("indices", [])) // 3
+    else:
+        manufacturing_features = recognize_manufacturing_features(shape, faces, bbox)
+
+    is_cylindrical = len(manufacturing_features['holes']) > 0 or len(manufacturing_features['bosses']) > 0
+    has_flat_surfaces = len(manufacturing_features['planar_faces']) > 0
+
+    # Calculate complexity based on actual features
+    through_holes = len(manufacturing_features.get('through_holes', []))
+    blind_holes = len(manufacturing_features.get('blind_holes', []))
+    bores = len(manufacturing_features.get('bores', []))
+    bosses = len(manufacturing_features.get('bosses', []))
+    fillets = len(manufacturing_features.get('fillets', []))
+
+    total_features = through_holes + blind_holes + bores + bosses + fillets
+
+    cylindrical_faces = len(manufacturing_features['holes']) + len(manufacturing_features['bosses'])
+    planar_faces = len(manufacturing_features['planar_faces'])
+    complexity_score = min(10, int(
+        (total_features / 5) +
+        (through_holes * 0.5) +
+        (blind_holes * 0.3) +
+        (bores * 0.2) +
+        (bosses * 0.4) +
+        (fillets * 0.1)
+    ))
+
+    # `bbox` (pole-based, tolerance-padded) only drives meshing and feature heuristics
+    dx, dy, dz = calculate_part_extents(shape, use_triangulation=include_mesh)
+
+    part_width_cm = dx / 10
+    part_height_cm = dy / 10
+    part_depth_cm = dz / 10
+
+    if include_mesh:
+        logger.info(f"✅ Analysis complete: {mesh_data['triangle_count']} triangles, {len(feature_edges)} edges")
+    else:
+        logger.info("✅ Analysis complete (mesh skipped)")
+
+    # Return mesh data for edge function to store (mesh_id will be added by edge function)
+    return {
+        'exact_volume': exact_props['volume'],
+        'exact_surface_area': exact_props['surface_area'],
+        'center_of_mass': exact_props['center_of_mass'],
+        'manufacturing_features': manufacturing_features,
+        'feature_summary': {
+            'through_holes': len(manufacturing_features.get('through_holes', [])),
+            'blind_holes': len(manufacturing_features.get('blind_holes', [])),
+            'bores': len(manufacturing_features.get('bores', [])),
+            'bosses': len(manufacturing_features.get('bosses', [])),
+            'total_holes': through_holes + blind_holes,
+            'planar_faces': planar_faces,
+            'fillets': fillets,
+            'complexity_score': complexity_score
+        },
+        'mesh_data': None if not include_mesh else {
+            'vertices': mesh_data['vertices'],
+            'indices': mesh_data['indices'],
+            'normals': mesh_data['normals'],
+            'vertex_colors': mesh_data['vertex_colors'],
+            'feature_edges': feature_edges,
+            'triangle_count': mesh_data['triangle_count'],
+            'face_classification_method': 'mesh_based_with_propagation',
+            'edge_extraction_method': 'smart_filtering_20deg_30segments',
+            'tessellation_quality': 'professional_8deg_angular_deflection'
+        },
+        'volume_cm3': exact_props['volume'] / 1000,
+        'surface_area_cm2': exact_props['surface_area'] / 100,
+        'is_cylindrical': is_cylindrical,
+        'has_flat_surfaces': has_flat_surfaces,
+        'complexity_score': complexity_score,
+        'part_width_cm': part_width_cm,
+        'part_height_cm': part_height_cm,
+        'part_depth_cm': part_depth_cm,
+        'total_faces': total_features,
+        'planar_faces': planar_faces,
+        'cylindrical_faces': cylindrical_faces,
+        'analysis_type': 'dual_representation',
+        'quotation_ready': True,
+        'status': 'success',
+        'confidence': 0.98,
+        'method': 'professional_quality_tessellation_12deg'
+    }
+
+
+def get_analysis_pool():
+    """Return the shared analysis process pool, or None when ANALYSIS_WORKERS is 0"""
+    global _analysis_pool
+    with _analysis_pool_lock:
+        if _analysis_pool is None and ANALYSIS_WORKERS > 0:
+            # spawn, not fork: the parent may already hold OCCT/Numba threads
+            _analysis_pool = ProcessPoolExecutor(
+                max_workers=ANALYSIS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _analysis_pool
+
+
+def warm_analysis_pool():
+    """Start the worker processes up front so the first upload doesn't pay for OCC imports"""
+    pool = get_analysis_pool()
+    if pool is None:
+        return
+    pids = {f.result() for f in [pool.submit(os.getpid) for _ in range(ANALYSIS_WORKERS)]}
+    logger.info(f"🧵 Analysis pool ready: {len(pids)} worker process(es)")
+
+
+def run_analysis(step_bytes, quality=DEFAULT_MESH_QUALITY,
+                 angular_deflection_deg=DEFAULT_ANGULAR_DEFLECTION_DEG, include_mesh=True):
+    """Run analyze_step_bytes() in the worker pool (inline if the pool is disabled)"""
+    global _analysis_pool
+    pool = get_analysis_pool()
+    if pool is None:
+        return analyze_step_bytes(step_bytes, quality, angular_deflection_deg, include_mesh)
+
+    try:
+        return pool.submit(analyze_step_bytes, step_bytes, quality, angular_deflection_deg, include_mesh).result()
+    except BrokenProcessPool:
+        # A worker died (e.g. OCCT segfault on a malformed file); start a fresh pool next time
+        logger.error("💥 Analysis worker crashed, restarting pool")
+        with _analysis_pool_lock:
+            if _analysis_pool is pool:
+                _analysis_pool = None
+        pool.shutdown(wait=False)
+        raise
+
+
+def format_mesh_payload(result, mesh_format, vertex_encoding="float32", normal_encoding="float32",
+                        index_encoding="uint32"):
+    """Return `result` with mesh arrays in the requested transport format (never mutates `result`)"""
+    if result['mesh_data'] is None:
+        return result
+
+    mesh = dict(result['mesh_data'])
+    mesh['vertex_colors'] = mesh_class_labels(mesh['vertex_colors'])
+    mesh['feature_edges'] = [points.tolist() for points in mesh['feature_edges']]
+    if mesh_format == "octet":
+        # Arrays stay NumPy; build_mesh_octet_stream() writes them as raw buffers
+        return {**result, 'mesh_data': mesh}
+    if mesh_format == "binary":
+        mesh_buffers = encode_mesh_buffers(mesh.pop('vertices'), mesh.pop('indices'), mesh.pop('normals'),
+                                           vertex_encoding, normal_encoding, index_encoding)
+        return {**result, 'mesh_data': {**mesh_buffers, **mesh}}
+
+    if not ORJSON_AVAILABLE:
+        # orjson writes NumPy arrays directly; the stdlib encoder needs lists
+        for key in ('vertices', 'indices', 'normals'):
+            mesh[key] = mesh[key].tolist()
+    return {**result, 'mesh_data': mesh}
+
+
+def json_response_body(payload):
+    """Serialize a response dict to JSON bytes (orjson when installed, with native NumPy arrays)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return jsonify(payload).get_data()
 
 
 @app.route("/analyze-cad", methods=["POST"])
@@ -929,115 +1990,91 @@ def analyze_cad():
         if not (filename.lower().endswith(".step") or filename.lower().endswith(".stp")):
             return jsonify({"error": "Only .step or .stp files supported"}), 400
 
-        step_bytes = file.read()
-        fd, tmp_path = tempfile.mkstemp(suffix=".step")
-        try:
-            os.write(fd, step_bytes)
-            os.close(fd)
-
-            reader = STEPControl_Reader()
-            status = reader.ReadFile(tmp_path)
-            if status != 1:
-                return jsonify({"error": "Failed to read STEP file"}), 400
-            reader.TransferRoots()
-            shape = reader.OneShape()
-        finally:
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-
-        logger.info("🔍 Analyzing BREP geometry...")
-        exact_props = calculate_exact_volume_and_area(shape)
-        manufacturing_features = recognize_manufacturing_features(shape)
-
-        logger.info("🎨 Generating display mesh with 12° angular deflection...")
-        mesh_data = tessellate_shape(shape)
+        # 'json' (default) returns number arrays, 'binary' returns base64 typed-array buffers,
+        # 'octet' returns one application/octet-stream body (see build_mesh_octet_stream)
+        mesh_format = request.form.get("mesh_format", "json").lower()
+        if mesh_format not in ("json", "binary", "octet"):
+            return jsonify({"error": f"Invalid mesh_format: {mesh_format}"}), 400
+
+        # Only apply to mesh_format=binary/octet. Vertices: 'float32' (default) or 'uint16'
+        # (quantized across the bounding box); normals: 'float32' (default), 'oct16' or
+        # 'oct8' (2x int16 / int8 per normal); indices: 'uint32' (default) or 'auto'
+        # (uint16 when the mesh has at most 65535 vertices)
+        vertex_encoding = request.form.get("vertex_encoding", "float32").lower()
+        if vertex_encoding not in ("float32", "uint16"):
+            return jsonify({"error": f"Invalid vertex_encoding: {vertex_encoding}"}), 400
+        normal_encoding = request.form.get("normal_encoding", "float32").lower()
+        if normal_encoding not in ("float32", "oct16", "oct8"):
+            return jsonify({"error": f"Invalid normal_encoding: {normal_encoding}"}), 400
+        index_encoding = request.form.get("index_encoding", "uint32").lower()
+        if index_encoding not in ("uint32", "auto"):
+            return jsonify({"error": f"Invalid index_encoding: {index_encoding}"}), 400
+
+        # include_mesh=false skips tessellation/classification/edges for quoting-only callers;
+        # include_mesh=preview meshes at PREVIEW_MESH_QUALITY regardless of `quality`
+        include_mesh = request.form.get("include_mesh", "true").lower()
+        if include_mesh not in ("true", "false", "preview"):
+            return jsonify({"error": f"Invalid include_mesh: {include_mesh}"}), 400
+        preview_mesh = include_mesh == "preview"
+        include_mesh = include_mesh != "false"
 
-        logger.info("🎨 Classifying face colors using MESH-BASED approach...")
-        vertex_colors = classify_mesh_faces(mesh_data, shape)
-        mesh_data["vertex_colors"] = vertex_colors
-
-        logger.info("📐 Extracting significant BREP edges with 30 segments/circle...")
-        feature_edges = extract_feature_edges(shape, max_edges=500, angle_threshold_degrees=20)
-        mesh_data["feature_edges"] = feature_edges
-        mesh_data["triangle_count"] = len(mesh_data.get("indices", [])) // 3
-
-        is_cylindrical = len(manufacturing_features['holes']) > 0 or len(manufacturing_features['bosses']) > 0
-        has_flat_surfaces = len(manufacturing_features['planar_faces']) > 0
-
-        # Calculate complexity based on actual features
-        through_holes = len(manufacturing_features.get('through_holes', []))
-        blind_holes = len(manufacturing_features.get('blind_holes', []))
-        bores = len(manufacturing_features.get('bores', []))
-        bosses = len(manufacturing_features.get('bosses', []))
-        fillets = len(manufacturing_features.get('fillets', []))
-
-        total_features = through_holes + blind_holes + bores + bosses + fillets
-
-        cylindrical_faces = len(manufacturing_features['holes']) + len(manufacturing_features['bosses'])
-        planar_faces = len(manufacturing_features['planar_faces'])
-        complexity_score = min(10, int(
-            (total_features / 5) +
-            (through_holes * 0.5) +
-            (blind_holes * 0.3) +
-            (bores * 0.2) +
-            (bosses * 0.4) +
-            (fillets * 0.1)
-        ))
-
-        bbox = Bnd_Box()
-        brepbndlib.Add(shape, bbox)
-        xmin, ymin, zmin, xmax, ymax, zmax = bbox.Get()
-
-        part_width_cm = (xmax - xmin) / 10
-        part_height_cm = (ymax - ymin) / 10
-        part_depth_cm = (zmax - zmin) / 10
+        try:
+            quality = float(request.form.get("quality", DEFAULT_MESH_QUALITY))
+            angular_deflection_deg = float(request.form.get("angular_deflection", DEFAULT_ANGULAR_DEFLECTION_DEG))
+        except ValueError:
+            return jsonify({"error": "quality and angular_deflection must be numbers"}), 400
+        # Snap to the precision that changes the mesh, so slider/float noise
+        # (0.85 vs 0.8500001) shares one cache entry instead of re-meshing
+        quality = round(quality, QUALITY_DECIMALS)
+        angular_deflection_deg = round(angular_deflection_deg, ANGULAR_DEFLECTION_DECIMALS)
+        if not 0.0 <= quality <= 1.0:
+            return jsonify({"error": f"Invalid quality: {quality} (expected 0-1)"}), 400
+        if not 0.0 < angular_deflection_deg <= 90.0:
+            return jsonify({"error": f"Invalid angular_deflection: {angular_deflection_deg} (expected 0-90 degrees)"}), 400
+        if preview_mesh:
+            quality = PREVIEW_MESH_QUALITY
 
-        logger.info(f"✅ Analysis complete: {mesh_data['triangle_count']} triangles, {len(feature_edges)} edges")
+        step_bytes = file.read()
+        file_hash = hashlib.sha256(step_bytes).hexdigest()
+        if include_mesh:
+            cache_key = (file_hash, quality, angular_deflection_deg, include_mesh)
+        else:
+            # Mesh parameters don't affect a no-mesh analysis, so they stay out of its key
+            cache_key = (file_hash, None, None, include_mesh)
+
+        response_key = cache_key + (mesh_format, vertex_encoding, normal_encoding, index_encoding)
+        cached_response = get_cached_response(response_key)
+        if cached_response is not None:
+            logger.info(f"♻️ Response cache hit for {filename} ({file_hash[:12]}), skipping analysis and encoding")
+            body, mimetype, headers = cached_response
+            return Response(body, mimetype=mimetype, headers=headers)
+
+        # No-mesh results are never taken from a meshed analysis: there, face areas,
+        # centers and part extents come from the triangulation, not exact geometry
+        result = get_cached_analysis(cache_key)
+        if result is not None:
+            logger.info(f"♻️ Cache hit for {filename} ({cache_key[0][:12]}), skipping STEP parse and tessellation")
+        else:
+            try:
+                result = run_analysis(step_bytes, quality, angular_deflection_deg, include_mesh)
+            except StepReadError as e:
+                return jsonify({"error": str(e)}), 400
+            cache_analysis(cache_key, result, persist=len(step_bytes) <= ANALYSIS_CACHE_MAX_UPLOAD_BYTES)
+
+        payload = format_mesh_payload(result, mesh_format, vertex_encoding, normal_encoding, index_encoding)
+        if mesh_format == "octet" and payload['mesh_data'] is not None:
+            body, vertex_count, index_count = build_mesh_octet_stream(payload, vertex_encoding, normal_encoding,
+                                                                           index_encoding)
+            serialized = (body, "application/octet-stream", {
+                "X-Vertex-Count": str(vertex_count),
+                "X-Index-Count": str(index_count),
+            })
+        else:
+            serialized = (json_response_body(payload), "application/json", {})
+        cache_response(response_key, serialized)
 
-        # Return mesh data for edge function to store (mesh_id will be added by edge function)
-        return jsonify({
-            'exact_volume': exact_props['volume'],
-            'exact_surface_area': exact_props['surface_area'],
-            'center_of_mass': exact_props['center_of_mass'],
-            'manufacturing_features': manufacturing_features,
-            'feature_summary': {
-                'through_holes': len(manufacturing_features.get('through_holes', [])),
-                'blind_holes': len(manufacturing_features.get('blind_holes', [])),
-                'bores': len(manufacturing_features.get('bores', [])),
-                'bosses': len(manufacturing_features.get('bosses', [])),
-                'total_holes': through_holes + blind_holes,
-                'planar_faces': planar_faces,
-                'fillets': fillets,
-                'complexity_score': complexity_score
-            },
-            'mesh_data': {
-                'vertices': mesh_data['vertices'],
-                'indices': mesh_data['indices'],
-                'normals': mesh_data['normals'],
-                'vertex_colors': mesh_data['vertex_colors'],
-                'feature_edges': feature_edges,
-                'triangle_count': mesh_data['triangle_count'],
-                'face_classification_method': 'mesh_based_with_propagation',
-                'edge_extraction_method': 'smart_filtering_20deg_30segments',
-                'tessellation_quality': 'professional_8deg_angular_deflection'
-            },
-            'volume_cm3': exact_props['volume'] / 1000,
-            'surface_area_cm2': exact_props['surface_area'] / 100,
-            'is_cylindrical': is_cylindrical,
-            'has_flat_surfaces': has_flat_surfaces,
-            'complexity_score': complexity_score,
-            'part_width_cm': part_width_cm,
-            'part_height_cm': part_height_cm,
-            'part_depth_cm': part_depth_cm,
-            'total_faces': total_features,
-            'planar_faces': planar_faces,
-            'cylindrical_faces': cylindrical_faces,
-            'analysis_type': 'dual_representation',
-            'quotation_ready': True,
-            'status': 'success',
-            'confidence': 0.98,
-            'method': 'professional_quality_tessellation_12deg'
-        })
+        body, mimetype, headers = serialized
+        return Response(body, mimetype=mimetype, headers=headers)
 
     except Exception as e:
         logger.error(f"Error processing CAD: {e}")
@@ -1081,4 +2118,5 @@ def health():
 
 
 if __name__ == "__main__":
+    warm_analysis_pool()
     app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,20 @@
+# Gunicorn settings for the geometry service (`gunicorn --config gunicorn.conf.py app:app`)
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Requests mostly wait on the analysis process pool (ANALYSIS_WORKERS), so one
+# web worker with threads serves concurrent uploads and keeps a single in-memory
+# analysis cache. Each extra web worker gets its own pool and cache.
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+# Large STEP files can take minutes to parse and mesh
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 300))
+
+
+def post_worker_init(worker):
+    # Start the analysis processes before the first request, as `python app.py` does
+    from app import warm_analysis_pool
+    warm_analysis_pool()
@@ -700,7 +700,7 @@ async function analyzeSTEPViaService(
           holes: (data.manufacturing_features.holes || []).map((h: any) => ({
             type: "hole" as const,
             diameter_mm: h.diameter,
-            depth_mm: 0,
+            depth_mm: h.depth ?? 0,
             through: true,
             position: h.position,
             axis: h.axis,